@@ -9,12 +9,33 @@ Author: John Shay
 License: MIT
 """
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, render_template, jsonify, request, stream_with_context
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
 from datetime import datetime
 import os
+import time
 import json
-import base64
-import requests
+import queue
+import threading
+
+from deal_targets import DEAL_TARGETS
+from dedup import DedupIndex, dedupe
+from ebay_api import (
+    BROWSE_MAX_PAGE_SIZE, BROWSE_SEARCH_PATH, api_url, ebay_get, get_token_manager, iter_browse_search,
+    set_api_base, use_shared_cache
+)
+from listing_history import get_listing_history
+from listings import ListingBatch, intern_fields
+from scan_log import get_scan_log
+import metrics
+import timing
+from quota import PRIORITY_HIGH, category_priority, get_quota_budget
+from query_planner import plan_searches, route_deals
+from scoring import rank_deals, score_deals
+from search_cache import SearchCache
+from shared_cache import SharedCache
+from watchlist_refresh import refresh_watchlist
+from watchlist_store import get_watchlist_store
 
 app = Flask(__name__, template_folder='templates')
 
@@ -41,206 +62,596 @@ ENV = load_env()
 EBAY_CLIENT_ID = ENV.get('EBAY_CLIENT_ID', '')
 EBAY_CLIENT_SECRET = ENV.get('EBAY_CLIENT_SECRET', '')
 
+# eBay API base URL (e.g. fake_ebay.py); the process environment still wins
+set_api_base(ENV.get('EBAY_API_BASE'))
+
 # Default price range
 DEFAULT_MIN_PRICE = 100
 DEFAULT_MAX_PRICE = 700
 
-# =============================================================================
-# Deal Targets - Categories to search
-# =============================================================================
-
-DEAL_TARGETS = [
-    # ===================
-    # ART - Street Art
-    # ===================
-    {'query': 'Mr Brainwash signed print', 'min_price': 100, 'max_price': 500, 'category': 'Mr. Brainwash'},
-    {'query': 'MBW signed print', 'min_price': 75, 'max_price': 400, 'category': 'Mr. Brainwash'},
-    {'query': 'Shepard Fairey signed print', 'min_price': 75, 'max_price': 400, 'category': 'Shepard Fairey'},
-    {'query': 'Obey Giant signed', 'min_price': 50, 'max_price': 300, 'category': 'Shepard Fairey'},
-    {'query': 'Death NYC signed', 'min_price': 30, 'max_price': 80, 'category': 'Death NYC'},
-    {'query': 'Death NYC framed', 'min_price': 40, 'max_price': 100, 'category': 'Death NYC'},
-    {'query': 'Banksy signed print', 'min_price': 200, 'max_price': 1000, 'category': 'Banksy'},
-
-    # ===================
-    # ART - KAWS
-    # ===================
-    {'query': 'KAWS signed print', 'min_price': 200, 'max_price': 600, 'category': 'KAWS'},
-    {'query': 'KAWS companion figure', 'min_price': 150, 'max_price': 400, 'category': 'KAWS'},
-    {'query': 'KAWS limited edition', 'min_price': 200, 'max_price': 500, 'category': 'KAWS'},
-    {'query': 'KAWS original fake', 'min_price': 150, 'max_price': 400, 'category': 'KAWS'},
-
-    # ===================
-    # BEARBRICK
-    # ===================
-    {'query': 'Bearbrick 1000%', 'min_price': 300, 'max_price': 700, 'category': 'Bearbrick'},
-    {'query': 'Bearbrick 1000 KAWS', 'min_price': 400, 'max_price': 800, 'category': 'Bearbrick'},
-    {'query': 'Medicom Bearbrick 1000', 'min_price': 300, 'max_price': 600, 'category': 'Bearbrick'},
-
-    # ===================
-    # NASA / SPACE
-    # ===================
-    {'query': 'Neil Armstrong signed', 'min_price': 500, 'max_price': 5000, 'category': 'NASA'},
-    {'query': 'Buzz Aldrin signed photo', 'min_price': 100, 'max_price': 500, 'category': 'NASA'},
-    {'query': 'Buzz Aldrin autograph COA', 'min_price': 150, 'max_price': 600, 'category': 'NASA'},
-    {'query': 'Michael Collins signed', 'min_price': 200, 'max_price': 800, 'category': 'NASA'},
-    {'query': 'Apollo 11 signed', 'min_price': 300, 'max_price': 2000, 'category': 'NASA'},
-    {'query': 'Apollo astronaut signed', 'min_price': 100, 'max_price': 500, 'category': 'NASA'},
-    {'query': 'NASA astronaut autograph COA', 'min_price': 75, 'max_price': 400, 'category': 'NASA'},
-    {'query': 'Space Shuttle signed', 'min_price': 100, 'max_price': 500, 'category': 'NASA'},
-    {'query': 'John Glenn signed', 'min_price': 150, 'max_price': 600, 'category': 'NASA'},
-    {'query': 'astronaut signed photo JSA', 'min_price': 100, 'max_price': 400, 'category': 'NASA'},
-    {'query': 'astronaut signed photo PSA', 'min_price': 100, 'max_price': 400, 'category': 'NASA'},
-
-    # ===================
-    # MUSIC - Signed Vinyl
-    # ===================
-    {'query': 'signed vinyl COA', 'min_price': 75, 'max_price': 300, 'category': 'Vinyl'},
-    {'query': 'signed vinyl JSA', 'min_price': 100, 'max_price': 400, 'category': 'Vinyl'},
-    {'query': 'signed vinyl BAS', 'min_price': 100, 'max_price': 400, 'category': 'Vinyl'},
-    {'query': 'Taylor Swift signed vinyl', 'min_price': 100, 'max_price': 400, 'category': 'Vinyl'},
-    {'query': 'Blink 182 signed', 'min_price': 150, 'max_price': 400, 'category': 'Vinyl'},
-    {'query': 'Green Day signed', 'min_price': 150, 'max_price': 400, 'category': 'Vinyl'},
-
-    # ===================
-    # MUSIC - Pickguards
-    # ===================
-    {'query': 'signed pickguard COA', 'min_price': 75, 'max_price': 300, 'category': 'Pickguard'},
-    {'query': 'autographed pickguard JSA', 'min_price': 100, 'max_price': 400, 'category': 'Pickguard'},
-    {'query': 'signed guitar pickguard', 'min_price': 75, 'max_price': 350, 'category': 'Pickguard'},
-]
+# Largest ?limit= accepted by /api/search (deep searches are paged from eBay)
+SEARCH_MAX_LIMIT = 1000
+
+# Search result cache: entries are fresh for TTL seconds, then served stale
+# for up to GRACE more seconds while refreshing in the background
+SEARCH_CACHE_TTL = 300
+SEARCH_CACHE_GRACE = 600
+SEARCH_CACHE_SIZE = 500
+
+# /api/comps fan-out: concurrent eBay searches and overall deadline (seconds)
+COMPS_MAX_WORKERS = 8
+COMPS_DEADLINE = 8
+
+# Targets searched per category, deals kept per target, and the most
+# listings a consolidated search (several targets merged into one query)
+# pages through looking for every target's deals
+COMPS_TARGETS_PER_CATEGORY = 2
+COMPS_DEALS_PER_TARGET = 3
+COMPS_PLAN_LIMIT = 1000
+
+# Seconds between background rebuilds of the /api/comps snapshot
+COMPS_REFRESH_INTERVAL = 300
+
+# Opt-in profiling: cProfile this fraction of requests and keep the
+# profiles of those slower than PROFILE_SLOW_MS in PROFILE_DIR
+PROFILE_SAMPLE_RATE = float(ENV.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SLOW_MS = float(ENV.get('PROFILE_SLOW_MS', 1000))
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), 'profiles')
+
+# Cross-process cache for multi-worker serving (serve.py sets it); unset
+# keeps every cache in-process
+SHARED_CACHE_DB = os.environ.get('SHARED_CACHE_DB') or ENV.get('SHARED_CACHE_DB')
+
+# Per-worker metric snapshots (serve.py sets it), so /metrics covers every
+# worker whichever one answers the scrape; unset reports this process only
+METRICS_DIR = os.environ.get('METRICS_DIR') or ENV.get('METRICS_DIR')
+if METRICS_DIR:
+    metrics.use_multiprocess_dir(METRICS_DIR)
 
 # =============================================================================
 # eBay Browse API
 # =============================================================================
 
-def get_browse_token():
-    """Get client credentials token for eBay Browse API"""
-    if not EBAY_CLIENT_ID or not EBAY_CLIENT_SECRET:
-        return None
+# Workers started by serve.py share search results, the eBay token and the
+# comps snapshot through one SQLite file
+shared_cache = SharedCache(SHARED_CACHE_DB) if SHARED_CACHE_DB else None
+if shared_cache:
+    use_shared_cache(shared_cache)
+
+# Cached results are held as column-packed ListingBatches, several times
+# smaller than the deal dicts
+search_cache = SearchCache(
+    max_entries=SEARCH_CACHE_SIZE,
+    ttl=SEARCH_CACHE_TTL,
+    grace=SEARCH_CACHE_GRACE,
+    shared=shared_cache,
+    pack=ListingBatch.from_dicts
+)
 
-    credentials = f"{EBAY_CLIENT_ID}:{EBAY_CLIENT_SECRET}"
-    encoded_creds = base64.b64encode(credentials.encode()).decode()
-
-    response = requests.post(
-        'https://api.ebay.com/identity/v1/oauth2/token',
-        headers={
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Authorization': f'Basic {encoded_creds}'
-        },
-        data={
-            'grant_type': 'client_credentials',
-            'scope': 'https://api.ebay.com/oauth/api_scope'
-        }
-    )
 
-    if response.status_code == 200:
-        return response.json().get('access_token')
-    return None
+def get_browse_token():
+    """Get client credentials token for eBay Browse API (cached process-wide)"""
+    return get_token_manager(EBAY_CLIENT_ID, EBAY_CLIENT_SECRET).get_token()
+
+
+def search_cache_key(query, max_price, min_price=0, limit=20, sort='price', marketplace='EBAY_US'):
+    """Normalize search arguments into a cache key"""
+    return (
+        ' '.join(query.lower().split()),
+        float(min_price),
+        float(max_price),
+        int(limit),
+        sort,
+        marketplace
+    )
 
 
-def search_ebay(query, max_price, min_price=0, limit=20):
+def search_ebay(query, max_price, min_price=0, limit=20, sort='price', marketplace='EBAY_US',
+                priority=PRIORITY_HIGH):
     """
-    Search eBay for items using Browse API
+    Search eBay for items using Browse API (served from search_cache when fresh)
 
     Args:
         query: Search keywords
         max_price: Maximum price filter
         min_price: Minimum price filter (helps filter fakes)
         limit: Number of results to return
+        sort: Browse API sort order
+        marketplace: eBay marketplace ID
+        priority: Quota priority; low priorities are answered from cache
+            (or come back empty) once the daily budget runs low
 
     Returns:
         List of item dictionaries
     """
-    token = get_browse_token()
-    if not token:
-        return []
+    key = search_cache_key(query, max_price, min_price, limit, sort, marketplace)
+    deals = search_cache.get_or_fetch(
+        key, lambda: ListingBatch.from_dicts(
+            fetch_ebay_search(query, max_price, min_price, limit, sort, marketplace, priority))
+    )
+    # Fresh dicts on every call, since callers tag deals in place
+    return deals.to_dicts() if deals else []
+
 
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'X-EBAY-C-MARKETPLACE-ID': 'EBAY_US',
+def browse_headers(marketplace='EBAY_US'):
+    """Browse API request headers with the current application token"""
+    return {
+        'Authorization': f'Bearer {get_browse_token()}',
+        'X-EBAY-C-MARKETPLACE-ID': marketplace,
         'Content-Type': 'application/json'
     }
 
+
+def browse_search_params(query, max_price, min_price=0, sort='price'):
+    """Browse API search params (without limit/offset)"""
     # Build price filter
     if min_price > 0:
         price_filter = f'price:[{min_price}..{max_price}]'
     else:
         price_filter = f'price:[..{max_price}]'
 
-    params = {
+    return {
         'q': query,
         'filter': f'{price_filter},priceCurrency:USD,buyingOptions:{{FIXED_PRICE|AUCTION}}',
-        'sort': 'price',
-        'limit': limit
+        'sort': sort
     }
 
+
+def summarize_item(item, max_price):
+    """Transform a Browse API item summary to our deal format (None if out of range)"""
+    price_info = item.get('price', {})
+    price = float(price_info.get('value', 0))
+
+    if price <= 0 or price > max_price:
+        return None
+
+    return intern_fields({
+        'id': item.get('itemId', ''),
+        'title': item.get('title', 'Unknown'),
+        'price': price,
+        'image': item.get('image', {}).get('imageUrl', ''),
+        'url': item.get('itemWebUrl', ''),
+        'condition': item.get('condition', 'Unknown'),
+        'seller': item.get('seller', {}).get('username', 'Unknown'),
+        'buying_option': item.get('buyingOptions', [''])[0] if item.get('buyingOptions') else '',
+        'location': item.get('itemLocation', {}).get('country', '')
+    })
+
+
+def fetch_ebay_search(query, max_price, min_price=0, limit=20, sort='price', marketplace='EBAY_US',
+                      priority=PRIORITY_HIGH):
+    """
+    Uncached Browse API search
+
+    Returns:
+        List of item dictionaries, or None if the request failed or the
+        quota budget deferred it
+    """
+    if not get_quota_budget().try_acquire(priority):
+        return None
+
+    with timing.span('token'):
+        headers = browse_headers(marketplace) if get_browse_token() else None
+    if not headers:
+        return None
+
+    params = browse_search_params(query, max_price, min_price, sort)
+    params['limit'] = limit
+
     try:
-        response = requests.get(
-            'https://api.ebay.com/buy/browse/v1/item_summary/search',
-            headers=headers,
-            params=params
-        )
+        with timing.span('browse'):
+            response = ebay_get(api_url(BROWSE_SEARCH_PATH), headers=headers, params=params)
 
+        if response.status_code == 401:
+            get_token_manager(EBAY_CLIENT_ID, EBAY_CLIENT_SECRET).invalidate()
         if response.status_code != 200:
-            return []
+            return None
 
-        data = response.json()
+        with timing.span('decode'):
+            data = response.json()
         items = data.get('itemSummaries', [])
 
         # Transform to simplified format
-        deals = []
-        for item in items:
-            price_info = item.get('price', {})
-            price = float(price_info.get('value', 0))
+        with timing.span('transform'):
+            deals = []
+            for item in items:
+                deal = summarize_item(item, max_price)
+                if deal:
+                    deals.append(deal)
 
-            if price <= 0 or price > max_price:
-                continue
+        return deals
+
+    except Exception as e:
+        print(f"Search error: {e}")
+        return None
 
-            deals.append({
-                'id': item.get('itemId', ''),
-                'title': item.get('title', 'Unknown'),
-                'price': price,
-                'image': item.get('image', {}).get('imageUrl', ''),
-                'url': item.get('itemWebUrl', ''),
-                'condition': item.get('condition', 'Unknown'),
-                'seller': item.get('seller', {}).get('username', 'Unknown'),
-                'buying_option': item.get('buyingOptions', [''])[0] if item.get('buyingOptions') else '',
-                'location': item.get('itemLocation', {}).get('country', '')
-            })
 
-        return deals
+def iter_search_ebay(query, max_price, min_price=0, max_items=200, sort='price',
+                     marketplace='EBAY_US', stop=None, priority=PRIORITY_HIGH, prefetch=None):
+    """
+    Lazily search eBay across result pages (uncached)
 
+    Pages are fetched on demand with the next page prefetched, so callers
+    can walk hundreds of results without holding them all in memory.
+
+    Args:
+        query: Search keywords
+        max_price: Maximum price filter
+        min_price: Minimum price filter
+        max_items: Stop after yielding this many deals
+        sort: Browse API sort order
+        marketplace: eBay marketplace ID
+        stop: Optional predicate on each deal; iteration ends at the first
+            deal it returns True for (that deal is not yielded)
+        priority: Quota priority charged for each page
+        prefetch: Fetch the next page while the caller reads this one
+            (default: only without a stop predicate)
+
+    Yields:
+        Item dictionaries in the same format as search_ebay
+    """
+    if max_items <= 0 or not get_browse_token():
+        return
+
+    items = iter_browse_search(
+        browse_search_params(query, max_price, min_price, sort),
+        lambda: browse_headers(marketplace),
+        page_size=min(max_items, BROWSE_MAX_PAGE_SIZE),
+        before_page=get_quota_budget().page_charger(priority),
+        max_items=max_items,
+        prefetch=stop is None if prefetch is None else prefetch
+    )
+
+    count = 0
+    try:
+        for item in items:
+            deal = summarize_item(item, max_price)
+            if deal is None:
+                continue
+            if stop and stop(deal):
+                return
+            yield deal
+            count += 1
+            if count >= max_items:
+                return
     except Exception as e:
         print(f"Search error: {e}")
-        return []
+    finally:
+        items.close()
 
 # =============================================================================
-# Watchlist Management
+# Comps - Deals by Category
 # =============================================================================
 
-WATCHLIST_FILE = os.path.join(os.path.dirname(__file__), 'watchlist.json')
+# Shared pool so searches that miss the deadline never block a response
+_comps_executor = ThreadPoolExecutor(max_workers=COMPS_MAX_WORKERS)
 
 
-def load_watchlist():
-    """Load watchlist from JSON file"""
+def group_targets_by_category(targets=None):
+    """Group deal targets by category, preserving DEAL_TARGETS order"""
+    by_category = {}
+    for target in targets or DEAL_TARGETS:
+        by_category.setdefault(target['category'], []).append(target)
+    return by_category
+
+
+def tag_target_deals(deals, target):
+    """Tag deals with the target's query, category and price band"""
+    for deal in deals:
+        deal['search_query'] = target['query']
+        deal['category'] = target['category']
+        deal['min_deal_price'] = target.get('min_price', 0)
+        deal['max_deal_price'] = target.get('max_price', 500)
+    return deals
+
+
+def search_target(target):
+    """Run one deal target search and tag results with the target's query and price band"""
+    deals = search_ebay(target['query'], target.get('max_price', 500), target.get('min_price', 0),
+                        limit=COMPS_DEALS_PER_TARGET, priority=category_priority(target['category']))
+    return tag_target_deals(deals, target)
+
+
+def search_plan(plan):
+    """
+    Run one planned search and split its deals back out per target
+
+    Returns:
+        Dict of target query -> tagged deals
+    """
+    if len(plan['targets']) == 1:
+        target = plan['targets'][0]
+        return {target['query']: search_target(target)}
+
+    # One broader search over the union of the targets' price bands. The
+    # cheapest listings may all belong to one target, so keep paging until
+    # every target has its deals; cached like search_ebay, keyed by members
+    key = search_cache_key(plan['query'], plan['max_price'], plan['min_price'], COMPS_PLAN_LIMIT)
+    key += tuple(target['query'] for target in plan['targets'])
+
+    def fetch():
+        scanned = []
+        listings = iter_search_ebay(plan['query'], plan['max_price'], plan['min_price'],
+                                    max_items=COMPS_PLAN_LIMIT, prefetch=False,
+                                    priority=category_priority(plan['category']))
+
+        def record():
+            for deal in listings:
+                scanned.append(deal)
+                yield deal
+
+        try:
+            route_deals(record(), plan['targets'], limit=COMPS_DEALS_PER_TARGET)
+        finally:
+            listings.close()
+        return ListingBatch.from_dicts(scanned) if scanned else None
+
+    deals = search_cache.get_or_fetch(key, fetch)
+    routed = route_deals(deals.to_dicts() if deals else [], plan['targets'],
+                         limit=COMPS_DEALS_PER_TARGET)
+    return {
+        target['query']: tag_target_deals(routed[target['query']], target)
+        for target in plan['targets']
+    }
+
+
+def iter_comps(deadline=None):
+    """
+    Search every category concurrently, yielding each category as it completes
+
+    Args:
+        deadline: Seconds to wait for all searches (default: COMPS_DEADLINE)
+
+    Yields:
+        Tuples of (category, status, deals). status is 'ok', 'timeout' or
+        'error'; deals are scored and best first, or None unless 'ok'.
+        Categories that miss the deadline come last.
+    """
+    if deadline is None:
+        deadline = COMPS_DEADLINE
+    by_category = {
+        cat: targets[:COMPS_TARGETS_PER_CATEGORY]
+        for cat, targets in group_targets_by_category().items()
+    }
+
+    # Overlapping targets in a category share one consolidated search
+    plans = plan_searches([t for targets in by_category.values() for t in targets])
+    plan_futures = {}
+    for plan in plans:
+        future = _comps_executor.submit(search_plan, plan)
+        for target in plan['targets']:
+            plan_futures[target['query']] = future
+
+    # Overlapping targets (e.g. "Mr Brainwash" / "MBW") find the same
+    # listings; keep each one once, in the first category to complete
+    index = DedupIndex()
+    pending = dict(by_category)
     try:
-        if os.path.exists(WATCHLIST_FILE):
-            with open(WATCHLIST_FILE, 'r') as f:
-                return json.load(f)
-    except Exception:
+        for future in as_completed(set(plan_futures.values()), timeout=deadline):
+            for cat, targets in list(pending.items()):
+                futures = [plan_futures[t['query']] for t in targets]
+                if future not in futures or not all(f.done() for f in futures):
+                    continue
+                del pending[cat]
+                if any(f.exception() for f in futures):
+                    yield cat, 'error', None
+                    continue
+
+                # Best deals first, graded against the category's market value
+                deals = [deal for t, f in zip(targets, futures) for deal in f.result()[t['query']]]
+                deals = dedupe(rank_deals(score_deals(deals, cat)), index)
+                # With one index per build, 'relist_of' means an earlier category has the listing
+                yield cat, 'ok', [deal for deal in deals if 'relist_of' not in deal]
+    except TimeoutError:
         pass
-    return []
 
+    for cat in pending:
+        yield cat, 'timeout', None
+
+
+def build_comps(deadline=None):
+    """
+    Search every category concurrently within an overall deadline
+
+    Args:
+        deadline: Seconds to wait for all searches (default: COMPS_DEADLINE)
+
+    Returns:
+        Tuple of (results, status). results maps category -> list of scored
+        deals, best first, for categories that finished in time; status maps every category
+        to 'ok', 'timeout' or 'error'.
+    """
+    results = {}
+    status = {}
+    for cat, cat_status, deals in iter_comps(deadline):
+        status[cat] = cat_status
+        if deals is not None:
+            results[cat] = deals
+    return results, status
+
+
+class CompsSnapshot:
+    """
+    Latest comps result, rebuilt periodically on a background thread
+
+    Each rebuild swaps in a new snapshot dict in one assignment, so readers
+    never take a lock and never see a half-built result. Categories that
+    miss the deadline keep their previous deals with status 'stale'. Each
+    category's deals are held as a ListingBatch and only turned back into
+    dicts when a response is serialized.
+
+    With a `shared` SharedCache, workers publish snapshots there and adopt
+    each other's; only the worker holding the rebuild lease rebuilds.
+    """
+
+    SHARED_KEY = 'comps:snapshot'
+    SHARED_TTL = 86400
+
+    def __init__(self, interval, shared=None, sync_interval=1.0):
+        self.interval = interval
+        self.shared = shared
+        self.sync_interval = sync_interval
+        self._last_sync = 0.0
+        self._snapshot = None
+        self._generation = 0
+        self._build_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._started = False
+
+    def start(self):
+        """Start the background refresher (idempotent)"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def get(self, timeout=None):
+        """Return the current snapshot, waiting up to timeout for the first build"""
+        self.start()
+        self._sync()
+        self._ready.wait(timeout)
+        return self._snapshot
+
+    def peek(self):
+        """Return the current snapshot (or None) without starting the refresher"""
+        self._sync()
+        return self._snapshot
+
+    def _sync(self, force=False):
+        """Adopt a newer snapshot another worker published (checked at most once per sync_interval)"""
+        if self.shared is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        entry = self.shared.get(self.SHARED_KEY)
+        if entry and (self._snapshot is None or entry[0]['built_at'] > self._snapshot['built_at']):
+            snapshot = entry[0]
+            # Stored as JSON; pack the deals again as this worker's own rebuild would
+            snapshot['results'] = {cat: ListingBatch.from_dicts(deals)
+                                   for cat, deals in snapshot['results'].items()}
+            self._snapshot = snapshot
+            self._ready.set()
+
+    def rebuild(self, on_category=None):
+        """
+        Rebuild now; callers arriving during a rebuild share its result
+
+        Args:
+            on_category: Optional callback(category, status, deals), called
+                as each category lands with its ListingBatch (or None), but
+                not for a shared result
+        """
+        generation = self._generation
+        with self._build_lock:
+            if self._generation != generation:
+                return self._snapshot
+
+            started = time.monotonic()
+            previous = self._snapshot
+            results = {}
+            status = {}
+            for cat, cat_status, deals in iter_comps():
+                if cat_status != 'ok' and previous and cat in previous['results']:
+                    deals, cat_status = previous['results'][cat], 'stale'
+                elif deals is not None:
+                    deals = ListingBatch.from_dicts(deals)
+                status[cat] = cat_status
+                if deals is not None:
+                    results[cat] = deals
+                if on_category:
+                    on_category(cat, cat_status, deals)
+
+            self._snapshot = {
+                'results': results,
+                'status': status,
+                'complete': all(s == 'ok' for s in status.values()),
+                'elapsed_ms': int((time.monotonic() - started) * 1000),
+                'built_at': time.time()
+            }
+            self._generation += 1
+            self._ready.set()
+            if self.shared is not None:
+                self.shared.set(self.SHARED_KEY, self._snapshot, self.SHARED_TTL)
+            return self._snapshot
+
+    def _run(self):
+        while True:
+            # A rebuild someone else triggered (e.g. ?refresh=1, or another
+            # worker) resets the timer
+            self._sync(force=True)
+            snapshot = self._snapshot
+            age = time.time() - snapshot['built_at'] if snapshot else self.interval
+            if age < self.interval:
+                time.sleep(self.interval - age)
+                continue
+
+            if self.shared is not None and not self.shared.acquire_lease('comps:rebuild', COMPS_DEADLINE * 4):
+                # Another worker is rebuilding; pick up its snapshot when it lands
+                time.sleep(self.sync_interval)
+                continue
+            try:
+                self.rebuild()
+            except Exception as e:
+                print(f"Comps refresh error: {e}")
+            finally:
+                if self.shared is not None:
+                    self.shared.release_lease('comps:rebuild')
+
+
+comps_snapshot = CompsSnapshot(interval=COMPS_REFRESH_INTERVAL, shared=shared_cache)
+
+# =============================================================================
+# Watchlist Management
+# =============================================================================
 
-def save_watchlist(items):
-    """Save watchlist to JSON file"""
-    with open(WATCHLIST_FILE, 'w') as f:
-        json.dump(items, f, indent=2)
+def load_watchlist():
+    """Load all watchlist items from the watchlist store"""
+    return get_watchlist_store().all()
 
 # =============================================================================
 # Flask Routes
 # =============================================================================
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    timing.start_request()
+    g.profile = timing.start_profile(PROFILE_SAMPLE_RATE)
+
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    Request latency by route, plus a Server-Timing header with the request's
+    spans (streamed responses: time until the body starts)
+    """
+    started = g.pop('request_started', None)
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    if started is not None:
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint,
+                                             method=request.method, status=response.status_code)
+
+    timer = timing.end_request()
+    if timer:
+        response.headers['Server-Timing'] = timer.header()
+
+    profile = g.pop('profile', None)
+    if profile and timer:
+        try:
+            path = timing.finish_profile(profile, timer.elapsed_ms(), PROFILE_SLOW_MS, PROFILE_DIR,
+                                         f'{request.method}-{endpoint}')
+            if path:
+                print(f"Slow request profile: {path}")
+        except Exception as e:
+            print(f"Profile error: {e}")
+    return response
+
+
 @app.route('/')
 def index():
     """Render main dashboard"""
@@ -256,6 +667,18 @@ def get_stats():
     })
 
 
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Get search cache hit/miss counters"""
+    return jsonify(search_cache.stats())
+
+
+@app.route('/api/quota')
+def get_quota():
+    """Get eBay call quota usage for the rolling window"""
+    return jsonify(get_quota_budget().stats())
+
+
 @app.route('/api/search')
 def search():
     """
@@ -265,46 +688,126 @@ def search():
         q: Search query (required)
         min_price: Minimum price (default: 100)
         max_price: Maximum price (default: 700)
+        limit: Number of results (default: 20, max: SEARCH_MAX_LIMIT). Above
+            one page, results are paged from eBay and streamed as they arrive.
     """
     query = request.args.get('q', '')
     min_price = float(request.args.get('min_price', DEFAULT_MIN_PRICE))
     max_price = float(request.args.get('max_price', DEFAULT_MAX_PRICE))
+    limit = max(1, min(int(request.args.get('limit', 20)), SEARCH_MAX_LIMIT))
 
     if not query:
         return jsonify([])
 
-    deals = search_ebay(query, max_price, min_price, limit=20)
-    return jsonify(deals)
+    if limit <= 20:
+        deals = search_ebay(query, max_price, min_price, limit=limit)
+        return jsonify(deals)
+
+    def generate():
+        yield '['
+        for i, deal in enumerate(iter_search_ebay(query, max_price, min_price, max_items=limit)):
+            yield (',' if i else '') + json.dumps(deal)
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 
 @app.route('/api/comps')
 def get_comps():
-    """Get deals organized by category from all targets"""
-    results = {}
+    """
+    Get deals organized by category from the latest comps snapshot
 
-    # Group targets by category
-    by_category = {}
-    for target in DEAL_TARGETS:
-        cat = target['category']
-        if cat not in by_category:
-            by_category[cat] = []
-        by_category[cat].append(target)
+    Query params:
+        refresh: Set to 1 to rebuild the snapshot before responding
+    """
+    if request.args.get('refresh') == '1':
+        snapshot = comps_snapshot.rebuild()
+    else:
+        snapshot = comps_snapshot.get(timeout=COMPS_DEADLINE + 1)
+
+    if snapshot is None:
+        return jsonify({'results': {}, 'status': {}, 'complete': False,
+                        'elapsed_ms': 0, 'built_at': None, 'age_seconds': None})
+
+    results = {cat: deals.to_dicts() for cat, deals in snapshot['results'].items()}
+    return jsonify({'results': results, **snapshot_summary(snapshot)})
 
-    # Search each category
-    for cat, targets in by_category.items():
-        results[cat] = []
-        for target in targets[:2]:  # Limit searches per category
-            min_price = target.get('min_price', 0)
-            max_price = target.get('max_price', 500)
-            deals = search_ebay(target['query'], max_price, min_price, limit=3)
 
-            for deal in deals:
-                deal['search_query'] = target['query']
-                deal['min_deal_price'] = min_price
-                deal['max_deal_price'] = max_price
-                results[cat].append(deal)
+def snapshot_summary(snapshot):
+    """Status and timing fields of a comps snapshot, for API responses"""
+    return {
+        'status': snapshot['status'],
+        'complete': snapshot['complete'],
+        'elapsed_ms': snapshot['elapsed_ms'],
+        'built_at': datetime.fromtimestamp(snapshot['built_at']).isoformat(),
+        'age_seconds': round(time.time() - snapshot['built_at'], 1)
+    }
+
 
-    return jsonify(results)
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/comps/stream')
+def stream_comps():
+    """
+    Stream comps as Server-Sent Events, one 'category' event per category
+    as soon as its searches complete, then a 'summary' event
+
+    Serves the current snapshot straight away; with ?refresh=1 (or before
+    the first snapshot exists) categories are sent as the rebuild lands them.
+
+    Query params:
+        refresh: Set to 1 to rebuild the snapshot while streaming
+    """
+    refresh = request.args.get('refresh') == '1'
+
+    def generate():
+        snapshot = comps_snapshot.peek()
+        sent = set()
+
+        if refresh or snapshot is None:
+            events = queue.Queue()
+
+            def run_rebuild():
+                try:
+                    events.put(('done', comps_snapshot.rebuild(
+                        on_category=lambda *category: events.put(('category', category)))))
+                except Exception as e:
+                    print(f"Comps stream error: {e}")
+                    events.put(('done', comps_snapshot.peek()))
+                # Started after the first build so it doesn't race this one for it
+                comps_snapshot.start()
+
+            threading.Thread(target=run_rebuild, daemon=True).start()
+            while True:
+                kind, payload = events.get()
+                if kind == 'done':
+                    snapshot = payload
+                    break
+                cat, cat_status, deals = payload
+                sent.add(cat)
+                yield sse_event('category', {'category': cat, 'status': cat_status,
+                                             'deals': deals.to_dicts() if deals else []})
+        else:
+            comps_snapshot.start()
+
+        if snapshot is None:
+            yield sse_event('summary', {'status': {}, 'complete': False, 'elapsed_ms': 0,
+                                        'built_at': None, 'age_seconds': None})
+            return
+
+        # Whatever the live rebuild didn't stream (all of it when serving the snapshot)
+        for cat, cat_status in snapshot['status'].items():
+            if cat not in sent:
+                deals = snapshot['results'].get(cat)
+                yield sse_event('category', {'category': cat, 'status': cat_status,
+                                             'deals': deals.to_dicts() if deals else []})
+        yield sse_event('summary', snapshot_summary(snapshot))
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/api/watchlist')
@@ -330,14 +833,38 @@ def add_to_watchlist():
         'status': 'watching'
     }
 
-    items = load_watchlist()
+    # Duplicate ids are ignored by the store
+    store = get_watchlist_store()
+    store.add(item)
+
+    return jsonify({'success': True, 'count': store.count()})
+
+
+@app.route('/api/watchlist/update', methods=['POST'])
+def update_watchlist_item():
+    """Update notes, price or status of a watchlist item"""
+    data = request.get_json()
+    item_id = data.get('id', '')
+
+    fields = {k: data[k] for k in ('title', 'price', 'notes', 'status') if k in data}
+    item = get_watchlist_store().update(item_id, **fields)
+    if item is None:
+        return jsonify({'success': False, 'error': 'not found'}), 404
+
+    return jsonify({'success': True, 'item': item})
 
-    # Check for duplicates
-    if not any(i['id'] == item['id'] for i in items):
-        items.append(item)
-        save_watchlist(items)
 
-    return jsonify({'success': True, 'count': len(items)})
+@app.route('/api/watchlist/refresh', methods=['POST'])
+def refresh_watchlist_items():
+    """
+    Check watchlist listings by eBay item id and mark them repriced, sold or ended
+
+    Query params:
+        force: 1 to look up items checked in the last few minutes too
+    """
+    force = request.args.get('force') == '1'
+    summary = refresh_watchlist(browse_headers, force=force)
+    return jsonify({'success': True, 'summary': summary, 'items': load_watchlist()})
 
 
 @app.route('/api/watchlist/remove', methods=['POST'])
@@ -346,11 +873,72 @@ def remove_from_watchlist():
     data = request.get_json()
     item_id = data.get('id', '')
 
-    items = load_watchlist()
-    items = [i for i in items if i['id'] != item_id]
-    save_watchlist(items)
+    store = get_watchlist_store()
+    store.remove(item_id)
 
-    return jsonify({'success': True, 'count': len(items)})
+    return jsonify({'success': True, 'count': store.count()})
+
+
+@app.route('/api/history')
+def get_history():
+    """
+    Query listing observations recorded by the daily scanner
+
+    Query params:
+        id: eBay item id (also returns its price history)
+        category: Scan category / source
+        since, until: ISO timestamps bounding the observation time
+        limit: Maximum rows (default: 200)
+    """
+    history = get_listing_history()
+    item_id = request.args.get('id')
+
+    rows = history.observations(
+        item_id=item_id,
+        category=request.args.get('category'),
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        limit=min(int(request.args.get('limit', 200)), 5000)
+    )
+
+    response = {'observations': rows}
+    if item_id:
+        response['price_history'] = history.price_history(item_id)
+    return jsonify(response)
+
+
+@app.route('/api/scans')
+def get_scans():
+    """
+    Deals from the scanner's compressed scan log, read through its index
+
+    With no filters, lists the logged dates. Otherwise returns one page of
+    matching deals, newest first.
+
+    Query params:
+        date: YYYY-MM-DD (or YYYYMMDD)
+        category: Scan category / source, or any matched category
+        id: eBay item id (every logged sighting)
+        scan: Scan id
+        limit: Maximum deals (default: 100, at most 1000)
+        offset: Deals to skip, for paging
+    """
+    log = get_scan_log()
+    date = request.args.get('date')
+    if date and len(date) == 8 and date.isdigit():
+        date = f'{date[:4]}-{date[4:6]}-{date[6:]}'
+    filters = {
+        'date': date,
+        'category': request.args.get('category'),
+        'item_id': request.args.get('id'),
+        'scan_id': request.args.get('scan'),
+    }
+    if not any(filters.values()):
+        return jsonify({'dates': log.dates()})
+
+    result = log.query(limit=min(int(request.args.get('limit', 100)), 1000),
+                       offset=int(request.args.get('offset', 0)), **filters)
+    return jsonify(result)
 
 
 @app.route('/health')
@@ -358,6 +946,13 @@ def health():
     """Health check endpoint"""
     return jsonify({'status': 'ok', 'app': 'deal-radar'})
 
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics (summed over server workers), plus the daily scanner's last-run gauges"""
+    body = metrics.render() + metrics.read_textfile()
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 # =============================================================================
 # Main
 # =============================================================================
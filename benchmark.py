@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+DATARADAR - Benchmarks
+Times the search pipeline against the offline eBay server (fake_ebay.py)
+and appends the results to benchmark_results.jsonl, flagging regressions
+against the previous run with the same settings
+
+Usage:
+    python benchmark.py                      # 5 runs, 50ms simulated eBay latency
+    python benchmark.py --runs 10 --latency 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+
+BENCH_RESULTS_FILE = BASE_DIR / 'benchmark_results.jsonl'
+
+# A metric this much worse than the previous comparable run is a regression
+REGRESSION_THRESHOLD = 0.20
+
+# Items pushed through the search transform per timing
+TRANSFORM_ITEMS = 50000
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _p(values, pct):
+    """Percentile of a list of timings"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def isolate_state(tmp_dir):
+    """Point every local store at tmp_dir so benchmarks never touch real state"""
+    import app
+    import daily_scanner
+    import listing_history
+    import metrics
+    import quota
+    import scan_log
+    import scan_queue
+    import watchlist_store
+
+    tmp_dir = Path(tmp_dir)
+    quota._budget = quota.QuotaBudget(limit=10 ** 9, state_file=tmp_dir / 'quota_state.json')
+    listing_history._history = listing_history.ListingHistory(tmp_dir / 'listing_history.db')
+    watchlist_store._store = watchlist_store.WatchlistStore(tmp_dir / 'watchlist.db', json_path=None)
+    scan_queue._queue = scan_queue.ScanQueue(tmp_dir / 'scan_queue.db')
+    scan_log._log = scan_log.ScanLog(tmp_dir / 'scan_log')
+    daily_scanner.HISTORY_DB = tmp_dir / 'listing_history.db'
+    daily_scanner.BASE_DIR = tmp_dir
+    metrics.SCANNER_METRICS_FILE = tmp_dir / 'scanner_metrics.prom'
+
+    # The fake accepts any credentials
+    app.EBAY_CLIENT_ID = app.EBAY_CLIENT_SECRET = 'benchmark'
+    daily_scanner.EBAY_CLIENT_ID = daily_scanner.EBAY_CLIENT_SECRET = 'benchmark'
+
+
+def bench_transform(items):
+    """Browse item summaries -> deal dicts, items per second"""
+    from app import summarize_item
+
+    batch = (items * (TRANSFORM_ITEMS // max(1, len(items)) + 1))[:TRANSFORM_ITEMS]
+    started = time.perf_counter()
+    for item in batch:
+        summarize_item(item, float('inf'))
+    return {'transform_items_per_sec': round(len(batch) / (time.perf_counter() - started))}
+
+
+def bench_search(runs):
+    """Uncached search_ebay calls through the full HTTP path"""
+    import app
+
+    timings = []
+    for _ in range(runs):
+        app.search_cache.clear()
+        started = time.perf_counter()
+        app.search_ebay('KAWS', 600, 150, limit=100)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'search_ebay_ms_p50': round(_p(timings, 50), 1)}
+
+
+def bench_comps(runs):
+    """/api/comps?refresh=1 end to end, cold (empty search cache) and warm"""
+    import app
+
+    client = app.app.test_client()
+    cold, warm = [], []
+    for _ in range(runs):
+        app.search_cache.clear()
+        started = time.perf_counter()
+        client.get('/api/comps?refresh=1')
+        cold.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        client.get('/api/comps?refresh=1')
+        warm.append((time.perf_counter() - started) * 1000)
+    return {
+        'comps_ms_p50': round(_p(cold, 50), 1),
+        'comps_ms_p95': round(_p(cold, 95), 1),
+        'comps_warm_ms_p50': round(_p(warm, 50), 1),
+    }
+
+
+def bench_daily_scan(runs, per_query):
+    """Full run_daily_scan wall time (scanner output suppressed)"""
+    from daily_scanner import run_daily_scan
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_daily_scan(results_per_query=per_query)
+        timings.append(time.perf_counter() - started)
+    return {'daily_scan_s_p50': round(_p(timings, 50), 3)}
+
+
+def find_regressions(metrics, settings, results_file=BENCH_RESULTS_FILE):
+    """Compare against the latest saved run with the same settings"""
+    if not Path(results_file).exists():
+        return []
+
+    previous = None
+    with open(results_file, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get('settings') == settings:
+                previous = entry
+    if not previous:
+        return []
+
+    regressions = []
+    for name, value in metrics.items():
+        before = previous['metrics'].get(name)
+        if not before:
+            continue
+        # Throughputs should go up, timings down
+        change = (before - value) / before if name.endswith('_per_sec') else (value - before) / before
+        if change > REGRESSION_THRESHOLD:
+            regressions.append(f"{name}: {before} -> {value} ({change:.0%} worse than {previous.get('commit')})")
+    return regressions
+
+
+def run_benchmarks(runs=5, latency=0.05, per_query=50, save=True):
+    """Run every benchmark against a fresh fake eBay server"""
+    port = _free_port()
+    # Must be set before ebay_api is imported (app, scanner and fake all import it)
+    os.environ['EBAY_API_BASE'] = f'http://127.0.0.1:{port}'
+
+    from fake_ebay import FakeEbayServer
+
+    fake = FakeEbayServer(port=port, latency=latency)
+    fake.start()
+    settings = {'runs': runs, 'latency': latency, 'per_query': per_query, 'catalog': len(fake.items)}
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            isolate_state(tmp_dir)
+            metrics = {}
+            metrics.update(bench_transform(fake.items))
+            metrics.update(bench_search(runs))
+            metrics.update(bench_comps(runs))
+            metrics.update(bench_daily_scan(runs, per_query))
+    finally:
+        fake.stop()
+
+    regressions = find_regressions(metrics, settings)
+
+    print("=" * 60)
+    print("DATARADAR - Benchmarks")
+    print(f"Settings: {settings}")
+    print("=" * 60)
+    for name, value in metrics.items():
+        print(f"  {name:<28} {value}")
+    print(f"  eBay calls: {fake.stats['searches']} searches, {fake.stats['tokens']} tokens")
+
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+
+    if save:
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'commit': _git_commit(),
+            'settings': settings,
+            'metrics': metrics,
+            'regressions': regressions
+        }
+        with open(BENCH_RESULTS_FILE, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        print(f"\nSaved to: {BENCH_RESULTS_FILE}")
+
+    return metrics, regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DATARADAR search pipeline benchmarks')
+    parser.add_argument('--runs', type=int, default=5, help='timed runs per benchmark (default: 5)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='simulated eBay latency in seconds (default: 0.05)')
+    parser.add_argument('--per-query', type=int, default=50,
+                        help='listings per search in the daily scan (default: 50)')
+    parser.add_argument('--no-save', action='store_true', help="don't append to benchmark_results.jsonl")
+    args = parser.parse_args()
+
+    _, found = run_benchmarks(runs=args.runs, latency=args.latency, per_query=args.per_query,
+                              save=not args.no_save)
+    raise SystemExit(1 if found else 0)
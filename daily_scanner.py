@@ -6,12 +6,27 @@ Scans eBay for deals based on watchlist and target categories
 
 import os
 import json
-import base64
-import requests
+import time
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
+from ebay_api import BROWSE_MAX_OFFSET, BROWSE_MAX_PAGE_SIZE, ensure_pool_size, get_token_manager, iter_browse_search
+from deal_targets import get_default_targets
+from dedup import DedupIndex, dedupe
+from listing_history import HISTORY_DB, get_listing_history
+from listings import Listing, intern_fields
+import metrics
+from poll_scheduler import WATCH_CALLS_PER_HOUR, get_poll_scheduler
+from quota import get_quota_budget, prioritize
+from scan_log import get_scan_log
+from scan_engine import SCAN_CONCURRENCY, SCAN_RATE_LIMIT, RateLimiter, run_searches
+from scan_queue import DEFAULT_SHARDS, DEFERRED, DONE, get_scan_queue, worker_id
+from scoring import rank_deals, score_deals
+from target_matcher import get_target_matcher
+from watchlist_refresh import ebay_item_id, refresh_watchlist
+from watchlist_store import get_watchlist_store
+
 # Load environment variables
 load_dotenv()
 
@@ -21,147 +36,236 @@ EBAY_CLIENT_SECRET = os.getenv('EBAY_CLIENT_SECRET')
 # Base directory for file operations
 BASE_DIR = Path(__file__).parent
 
+# An unfinished scan younger than this is resumed instead of started over
+SCAN_RESUME_WINDOW = 12 * 60 * 60
 
-def get_ebay_token():
-    """Get eBay Browse API token"""
-    credentials = f"{EBAY_CLIENT_ID}:{EBAY_CLIENT_SECRET}"
-    encoded_creds = base64.b64encode(credentials.encode()).decode()
-
-    response = requests.post(
-        'https://api.ebay.com/identity/v1/oauth2/token',
-        headers={
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Authorization': f'Basic {encoded_creds}'
-        },
-        data={
-            'grant_type': 'client_credentials',
-            'scope': 'https://api.ebay.com/oauth/api_scope'
-        }
-    )
-    return response.json().get('access_token')
-
-
-def load_watchlist():
-    """Load watchlist items from JSON file"""
-    watchlist_path = BASE_DIR / 'watchlist.json'
-    if watchlist_path.exists():
-        with open(watchlist_path, 'r') as f:
-            return json.load(f)
-    return []
-
+# Watch mode re-reads the watchlist this often, and sleeps at most this
+# long between checks for due searches (seconds)
+WATCH_RELOAD_SECONDS = 600
+WATCH_IDLE_SECONDS = 30
 
-def get_default_targets():
-    """Default deal targets with COA requirements"""
-    return [
-        # Space memorabilia - signed with COA
-        {'query': 'Neil Armstrong signed photo COA', 'min_price': 500, 'max_price': 5000, 'category': 'Space'},
-        {'query': 'Buzz Aldrin signed photo COA', 'min_price': 100, 'max_price': 800, 'category': 'Space'},
-        {'query': 'Michael Collins signed photo COA', 'min_price': 200, 'max_price': 1000, 'category': 'Space'},
+# Most listings a watch poll pages through
+WATCH_PER_QUERY = 50
 
-        # Street Art
-        {'query': 'Death NYC signed print', 'min_price': 50, 'max_price': 200, 'category': 'Street Art'},
-        {'query': 'Shepard Fairey signed print', 'min_price': 100, 'max_price': 500, 'category': 'Street Art'},
-        {'query': 'Mr Brainwash signed print', 'min_price': 100, 'max_price': 400, 'category': 'Street Art'},
+# Watch mode keeps its own scan marks (this prefix + query), so its polls
+# don't use up what --incremental daily scans report as new
+WATCH_MARK_PREFIX = 'watch:'
 
-        # Signed Pickguards with COA
-        {'query': 'signed pickguard COA', 'min_price': 75, 'max_price': 500, 'category': 'Pickguard'},
 
-        # Vinyl Records - signed with COA
-        {'query': 'signed vinyl COA authenticated', 'min_price': 75, 'max_price': 500, 'category': 'Vinyl'},
-        {'query': 'Fred Again signed vinyl COA', 'min_price': 100, 'max_price': 400, 'category': 'Vinyl'},
-
-        # Celebrity autographs with COA
-        {'query': 'Taylor Swift signed COA', 'min_price': 100, 'max_price': 700, 'category': 'Celebrity'},
-        {'query': 'Hunter S Thompson signed COA', 'min_price': 100, 'max_price': 500, 'category': 'Celebrity'},
-    ]
+def get_ebay_token():
+    """Get eBay Browse API token (cached process-wide)"""
+    return get_token_manager(EBAY_CLIENT_ID, EBAY_CLIENT_SECRET).get_token()
 
 
-def search_ebay_deals(query, max_price=500, limit=10):
-    """Search eBay for deals"""
-    token = get_ebay_token()
+def load_watchlist():
+    """Load watchlist items from the watchlist store"""
+    return get_watchlist_store().all()
 
-    if not token:
-        print("Failed to get eBay token")
-        return []
 
-    headers = {
-        'Authorization': f'Bearer {token}',
+def scanner_headers():
+    """Browse API request headers with the current token"""
+    return {
+        'Authorization': f'Bearer {get_ebay_token()}',
         'X-EBAY-C-MARKETPLACE-ID': 'EBAY_US',
         'Content-Type': 'application/json'
     }
 
+
+def summarize_listing(item):
+    """Transform a Browse API item summary to the scanner's deal format (None if unpriced)"""
+    price_info = item.get('price', {})
+    price = float(price_info.get('value', 0))
+
+    if price <= 0:
+        return None
+
+    image = None
+    if item.get('thumbnailImages'):
+        image = item['thumbnailImages'][0].get('imageUrl')
+    elif item.get('image'):
+        image = item['image'].get('imageUrl')
+
+    return intern_fields({
+        'id': item.get('itemId', ''),
+        'title': item.get('title', 'Unknown'),
+        'price': price,
+        'url': item.get('itemWebUrl', ''),
+        'image': image,
+        'condition': item.get('condition', 'Unknown'),
+        'seller': item.get('seller', {}).get('username', 'Unknown'),
+        'listed_date': item.get('itemCreationDate', '')
+    })
+
+
+def iter_ebay_deals(query, max_price=500, max_items=100, stop=None, before_page=None,
+                    page_size=None):
+    """
+    Lazily page through newly listed eBay deals for a query
+
+    Args:
+        query: Search keywords
+        max_price: Maximum price filter
+        max_items: Stop after yielding this many deals
+        stop: Optional predicate on each deal; iteration ends at the first
+            deal it returns True for (that deal is not yielded)
+        before_page: Optional callable run before each page request; return
+            False to stop paging (used for the quota budget)
+        page_size: Listings per eBay call (default: max_items, up to the
+            Browse API maximum)
+
+    Yields:
+        Deal dictionaries, newest first
+
+    Returns:
+        Why iteration ended (the generator's return value): 'stopped' (stop
+        matched), 'limit' (max_items reached), 'exhausted' (no more
+        results) or 'incomplete' (error, or a page refused by before_page)
+    """
+    if max_items <= 0:
+        return 'limit'
+
+    if not get_ebay_token():
+        print("Failed to get eBay token")
+        return 'incomplete'
+
     params = {
         'q': query,
         'filter': f'price:[..{max_price}],priceCurrency:USD',
-        'sort': 'newlyListed',
-        'limit': limit
+        'sort': 'newlyListed'
     }
-
+    # With a stop mark, paging usually ends inside the first page, so pages
+    # are only fetched on demand
+    items = iter_browse_search(params, scanner_headers,
+                               page_size=page_size or min(max_items, BROWSE_MAX_PAGE_SIZE),
+                               before_page=before_page, max_items=max_items,
+                               prefetch=stop is None)
+
+    count = 0
     try:
-        resp = requests.get(
-            'https://api.ebay.com/buy/browse/v1/item_summary/search',
-            headers=headers,
-            params=params
-        )
-
-        if resp.status_code != 200:
-            print(f"eBay API error: {resp.status_code}")
-            return []
-
-        data = resp.json()
-        items = data.get('itemSummaries', [])
-
-        deals = []
-        for item in items:
-            price_info = item.get('price', {})
-            price = float(price_info.get('value', 0))
-
-            if price <= 0:
+        while True:
+            try:
+                item = next(items)
+            except StopIteration as end:
+                return 'exhausted' if end.value else 'incomplete'
+            deal = summarize_listing(item)
+            if deal is None:
                 continue
-
-            image = None
-            if item.get('thumbnailImages'):
-                image = item['thumbnailImages'][0].get('imageUrl')
-            elif item.get('image'):
-                image = item['image'].get('imageUrl')
-
-            deals.append({
-                'id': item.get('itemId', ''),
-                'title': item.get('title', 'Unknown'),
-                'price': price,
-                'url': item.get('itemWebUrl', ''),
-                'image': image,
-                'condition': item.get('condition', 'Unknown'),
-                'seller': item.get('seller', {}).get('username', 'Unknown'),
-                'listed_date': item.get('itemCreationDate', '')
-            })
-
-        return deals
+            if stop and stop(deal):
+                return 'stopped'
+            yield deal
+            count += 1
+            if count >= max_items:
+                return 'limit'
     except Exception as e:
         print(f"Search error for {query}: {e}")
-        return []
-
+        return 'incomplete'
+    finally:
+        items.close()
 
-def run_daily_scan():
-    """Main daily scan function"""
-    print("=" * 60)
-    print(f"DATARADAR - Daily Deal Scanner")
-    print(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    print("=" * 60)
 
+def search_ebay_deals(query, max_price=500, limit=10):
+    """Search eBay for deals (first `limit` results)"""
+    return list(iter_ebay_deals(query, max_price=max_price, max_items=limit))
+
+
+def scan_new_listings(query, max_price, history, max_items=200, before_page=None, mark_key=None):
+    """
+    Incremental scan: only listings that are new or repriced since the last run
+
+    Pages through newest-first results and stops at the first listing
+    created before the query's high-water mark. Listings at or after the
+    mark that were already processed at the same price are skipped, and
+    don't count towards max_items.
+
+    The mark only moves up to the newest listing once paging has reached
+    the old mark (or the end of the results). A scan cut short by
+    max_items, the quota or an error keeps the old mark, so the listings it
+    didn't get to are picked up next run; the ones it did are in seen.
+
+    The mark is returned rather than saved, so the caller can store it
+    (history.save_scan_mark) only once the deals themselves are safe. It
+    is read from mark_key (default: the query), so separate consumers of
+    the same query can keep separate marks.
+
+    Returns:
+        Tuple of (deals, mark, outcome). Each deal is tagged with 'change'
+        ('new' or 'repriced') and, for repriced ones, 'previous_price'; mark
+        is the query's new (high_water, seen); outcome is why paging ended
+        (see iter_ebay_deals)
+    """
+    high_water, seen = history.scan_mark(mark_key or query)
+
+    def reached_processed(deal):
+        return bool(high_water) and deal['listed_date'] < high_water
+
+    deals = []
+    scanned = {}  # this run's listings, newest first
+    newest = high_water
+    # Seen listings are skipped without counting, so page past them freely
+    listings = iter_ebay_deals(query, max_price=max_price, max_items=BROWSE_MAX_OFFSET,
+                               stop=reached_processed, before_page=before_page,
+                               page_size=min(max_items, BROWSE_MAX_PAGE_SIZE))
+    outcome = 'limit'
+    try:
+        while len(deals) < max_items:
+            try:
+                deal = next(listings)
+            except StopIteration as end:
+                outcome = end.value
+                break
+            if deal['id'] in scanned:
+                continue
+            scanned[deal['id']] = deal['price']
+            newest = max(newest, deal['listed_date'])
+
+            previous_price = seen.get(deal['id'])
+            if previous_price is None:
+                deal['change'] = 'new'
+            elif previous_price != deal['price']:
+                deal['change'] = 'repriced'
+                deal['previous_price'] = previous_price
+            else:
+                continue
+            deals.append(deal)
+    finally:
+        listings.close()
+
+    # Keep seen ordered oldest to newest
+    for item_id, price in reversed(list(scanned.items())):
+        seen.pop(item_id, None)
+        seen[item_id] = price
+    if outcome in ('stopped', 'exhausted') or not high_water:
+        high_water = newest
+    return deals, (high_water, seen), outcome
+
+
+def build_searches(max_searches=None, verbose=True):
+    """
+    Watchlist items plus default targets, deduplicated by query and in
+    priority order (watchlist first, then high-margin categories)
+
+    verbose=False skips the summary printout (watch mode rebuilds the list
+    every few minutes).
+    """
     # Load watchlist
     watchlist = load_watchlist()
-    print(f"\nWatchlist items: {len(watchlist)}")
 
     # Get default targets
     targets = get_default_targets()
-    print(f"Target categories: {len(targets)}")
+    if verbose:
+        print(f"\nWatchlist items: {len(watchlist)}")
+        print(f"Target categories: {len(targets)}")
 
     # Combine watchlist and targets
     search_queries = []
 
-    # Add watchlist items
+    # Add watchlist items; those tied to a listing are checked by item id
+    # instead (refresh_watchlist), not searched by title
+    by_id = 0
     for item in watchlist:
+        if ebay_item_id(item):
+            by_id += 1
+            continue
         search_queries.append({
             'query': item['title'],
             'max_price': item.get('price', 500),
@@ -184,58 +288,498 @@ def run_daily_scan():
             seen.add(q['query'])
             unique_queries.append(q)
 
-    print(f"Unique searches: {len(unique_queries)}")
+    # Watchlist first, then high-margin categories
+    unique_queries = prioritize(unique_queries)
 
-    # Scan for deals
-    all_deals = []
+    if verbose:
+        print(f"Unique searches: {len(unique_queries)} ({by_id} watchlist listings checked by id)")
+    return unique_queries[:max_searches]
 
-    for query_info in unique_queries[:25]:  # Limit to 25 searches per scan
-        query = query_info['query']
-        max_price = query_info['max_price']
-        print(f"\nScanning: {query} (max ${max_price})...")
 
-        deals = search_ebay_deals(query, max_price=max_price, limit=5)
+def scan_settings(results_per_query=5, incremental=False, max_searches=None):
+    """Options stored with a queued scan; a scan only resumes with identical settings"""
+    return {
+        'mode': 'incremental' if incremental else 'full',
+        'results_per_query': results_per_query,
+        'max_searches': max_searches
+    }
 
-        for deal in deals:
-            deal['search_query'] = query
-            deal['source'] = query_info['source']
-            all_deals.append(deal)
 
+def tag_deals(deals, query_info, matcher):
+    """Attach the search that found each deal and every target it matches"""
+    for deal in deals:
+        deal['search_query'] = query_info['query']
+        deal['source'] = query_info['source']
+        deal['max_deal_price'] = query_info['max_price']
+
+        # Every target and category the listing satisfies, not just the query that found it
+        classification = matcher.classify(deal['title'], deal['price'])
+        deal['matched_targets'] = classification['targets']
+        deal['matched_categories'] = classification['categories']
+        deal['authenticators'] = classification['authenticators']
+    return deals
+
+
+def enqueue_scan(results_per_query=5, incremental=False, max_searches=None, shards=DEFAULT_SHARDS):
+    """Queue a scan with one job per search and return its id"""
+    searches = build_searches(max_searches)
+    settings = scan_settings(results_per_query, incremental, max_searches)
+    scan_id = get_scan_queue().create_scan(searches, settings, shards=shards)
+    print(f"Queued scan {scan_id}: {len(searches)} jobs over {shards} shards")
+    return scan_id
+
+
+def run_scan_worker(scan_id, concurrency=SCAN_CONCURRENCY, rate_limit=SCAN_RATE_LIMIT, shards=None):
+    """
+    Work through a queued scan's jobs until none are left to claim
+
+    Runs up to `concurrency` jobs at once on the concurrent engine,
+    claiming the next job as each one finishes. Each page fetched renews the job's lease, and each
+    finished job's deals are stored on the queue at once, so a crash loses
+    at most the searches in flight. Any number of workers can run this on
+    the same scan.
+
+    Args:
+        scan_id: Queued scan to work on
+        concurrency: Searches run at once
+        rate_limit: eBay calls per second for this worker
+        shards: Optional shard numbers to serve (default: all)
+
+    Returns:
+        Number of jobs this worker finished
+    """
+    queue = get_scan_queue()
+    scan = queue.scan(scan_id)
+    if not scan:
+        print(f"No such scan: {scan_id}")
+        return 0
+    scan_log = get_scan_log()
+    incremental = scan['settings']['mode'] == 'incremental'
+    results_per_query = scan['settings']['results_per_query']
+
+    owner = worker_id()
+    budget = get_quota_budget()
+    history = get_listing_history()
+    matcher = get_target_matcher()
+    limiter = RateLimiter(rate_limit)
+    # Each search may prefetch its next page, so allow two connections per search
+    ensure_pool_size(2 * concurrency)
+
+    def scan_one(job):
+        job_id, query_info = job['job_id'], job['search']
+        query = query_info['query']
+        max_price = query_info['max_price']
+        if not get_ebay_token():
+            raise RuntimeError('no eBay token')
+
+        # First page is already paid for; deeper pages are charged as they load
+        charge = budget.page_charger(query_info['priority'], prepaid=1)
+
+        def before_page():
+            return charge() and limiter.wait() and queue.checkpoint(scan_id, job_id, owner)
+
+        if incremental:
+            deals, mark, outcome = scan_new_listings(query, max_price, history,
+                                                     max_items=results_per_query,
+                                                     before_page=before_page)
+        else:
+            deals, mark = [], None
+            listings = iter_ebay_deals(query, max_price=max_price, max_items=results_per_query,
+                                       before_page=before_page)
+            while True:
+                try:
+                    deals.append(next(listings))
+                except StopIteration as end:
+                    outcome = end.value
+                    break
+
+        # A search cut short by an error or a refused page fails the job, so
+        # it is retried (and reported failed by merge_scan once out of
+        # attempts) rather than finishing with partial results
+        if outcome == 'incomplete':
+            raise RuntimeError(f'search incomplete after {len(deals)} deals')
+        return deals, mark
+
+    def on_result(job, result):
+        query_info = job['search']
+        deals, mark = result
+        deals = tag_deals(deals, query_info, matcher)
+
+        score_deals(deals)
+
+        # A job whose lease was lost is another worker's now; drop our copy,
+        # and leave the scan mark for the worker that reruns it
+        if not queue.complete(scan_id, job['job_id'], owner, deals):
+            return
+        finished[0] += 1
+        if mark:
+            history.save_scan_mark(query_info['query'], *mark)
+
+        # Append to the listing history and the scan log as searches finish,
+        # so price changes are kept and /api/scans sees deals right away
+        history.record(deals)
+        try:
+            scan_log.append(deals, scan_id=scan_id)
+        except OSError as e:
+            print(f"Scan log error: {e}")
         if deals:
-            print(f"  Found {len(deals)} items")
-
-    # Sort by price
-    all_deals.sort(key=lambda x: x['price'])
+            print(f"  {query_info['query']} (max ${query_info['max_price']}): {len(deals)} items")
+
+    def on_error(job, error):
+        queue.fail(scan_id, job['job_id'], owner, error)
+
+    def claim_jobs():
+        # One job per free slot, in priority order, spending the quota as
+        # each is claimed so when it is low the watchlist and high-margin
+        # searches still get their calls
+        while True:
+            claimed = queue.claim(scan_id, owner, limit=1, shards=shards)
+            if not claimed:
+                return
+            job_id, query_info = claimed[0]
+            if budget.try_acquire(query_info['priority']):
+                yield {'job_id': job_id, 'search': query_info, 'query': query_info['query']}
+            else:
+                queue.defer(scan_id, job_id, owner)
+                finished[0] += 1
+
+    finished = [0]
+    print(f"\nWorker {owner} on scan {scan_id}, {concurrency} searches at a time...")
+    while True:
+        run_searches(claim_jobs(), scan_one, on_result, concurrency=concurrency, on_error=on_error)
+
+        # Nothing claimable: wait for retries and for jobs held by workers
+        # that may have died
+        wait = queue.next_wakeup(scan_id, shards)
+        if wait is None:
+            break
+        time.sleep(min(wait + 0.1, 5))
+
+    return finished[0]
+
+
+def merge_scan(scan_id, force=False):
+    """
+    Assemble a queued scan's job results into the scan_results file
+
+    Deals are collected in search priority order, then scored, ranked and
+    deduplicated exactly as a single-process scan would.
+
+    Args:
+        scan_id: Queued scan to merge
+        force: Merge even if some jobs are still unfinished (they are
+            reported as failed)
+
+    Returns:
+        The results dict, or None if the scan is missing or unfinished
+    """
+    queue = get_scan_queue()
+    scan = queue.scan(scan_id)
+    if not scan:
+        print(f"No such scan: {scan_id}")
+        return None
+    if not scan['complete'] and not force:
+        print(f"Scan {scan_id} is not finished: {scan['jobs']}")
+        return None
+
+    # Held as slotted Listings from here to the results file, which for a
+    # large scan takes noticeably less memory than the decoded dicts
+    all_deals = []
+    deferred = []
+    failed = []
+    for search, status, deals in queue.results(scan_id):
+        if status == DONE:
+            all_deals.extend(Listing.from_dict(deal) for deal in deals)
+        elif status == DEFERRED:
+            deferred.append(search['query'])
+        else:
+            failed.append(search['query'])
+
+    # Grade against market value and rank best first, then collapse the
+    # same listing (or a relisting) found by several queries
+    rank_deals(score_deals(all_deals))
+    found = len(all_deals)
+    dedup_index = DedupIndex(HISTORY_DB)
+    all_deals = dedupe(all_deals, dedup_index)
 
     # Save results
     results = {
         'scan_date': datetime.now().isoformat(),
-        'searches': len(unique_queries),
+        'mode': scan['settings']['mode'],
+        'searches': scan['searches'],
         'deals_found': len(all_deals),
+        'deferred': deferred,
         'deals': all_deals
     }
 
     results_file = BASE_DIR / f"scan_results_{datetime.now().strftime('%Y%m%d')}.json"
     with open(results_file, 'w') as f:
-        json.dump(results, f, indent=2)
+        json.dump(results, f, indent=2, default=Listing.to_dict)
+    queue.mark_merged(scan_id)
+    queue.prune()
+    dedup_index.purge()
+
+    # Last-run gauges for the app's /metrics (this process exits after the scan);
+    # the duration counts only time spent scanning, not downtime before a resume
+    mode = results['mode']
+    metrics.SCAN_DURATION.set(round(queue.active_seconds(scan_id), 3), mode=mode)
+    metrics.SCAN_LAST_RUN.set(int(time.time()), mode=mode)
+    metrics.SCAN_SEARCHES.set(scan['searches'], mode=mode)
+    metrics.SCAN_DEALS.set(len(all_deals), mode=mode)
+    try:
+        metrics.write_textfile(metrics.SCANNER_METRICS)
+    except OSError as e:
+        print(f"Metrics write error: {e}")
 
     print(f"\n{'=' * 60}")
     print(f"SCAN COMPLETE")
     print(f"{'=' * 60}")
-    print(f"Searches: {len(unique_queries)}")
-    print(f"Deals found: {len(all_deals)}")
+    print(f"Scan: {scan_id}")
+    print(f"Searches: {scan['searches']}")
+    print(f"Deals found: {len(all_deals)} ({found - len(all_deals)} duplicates collapsed)")
+    if deferred:
+        print(f"Deferred (quota low): {len(deferred)} - {get_quota_budget().remaining()} calls left")
+    if failed:
+        print(f"Failed: {len(failed)} - {', '.join(failed[:5])}")
     print(f"Results saved: {results_file}")
+    print(f"History: {get_listing_history().db.db_path}")
 
     # Show top deals
     if all_deals:
         print(f"\nTOP 10 DEALS:")
         print("-" * 60)
         for deal in all_deals[:10]:
-            print(f"  ${deal['price']:>7.2f} | {deal['title'][:50]}")
+            print(f"  {deal['grade'] or '-':<2} ${deal['price']:>7.2f} | {deal['title'][:50]}")
             print(f"           {deal['url']}")
 
     return results
 
 
+def run_daily_scan(results_per_query=5, incremental=False, max_searches=None,
+                   concurrency=SCAN_CONCURRENCY, rate_limit=SCAN_RATE_LIMIT, resume=True):
+    """
+    Main daily scan function: queue, work and merge in one process
+
+    Args:
+        results_per_query: Listings to collect per search; values above one
+            page are paged lazily from eBay
+        incremental: Report only listings that are new or repriced since the
+            previous incremental scan, and stop paging at the first one
+            already processed
+        max_searches: Maximum searches per scan (default: all of them;
+            the quota budget still defers low-priority ones when it runs low)
+        concurrency: Searches run at once
+        rate_limit: eBay calls per second across the scan
+        resume: Continue an unfinished scan with the same settings from
+            the last SCAN_RESUME_WINDOW seconds instead of starting over
+    """
+    print("=" * 60)
+    print(f"DATARADAR - Daily Deal Scanner")
+    print(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    print("=" * 60)
+
+    print()
+    refresh_watchlist(scanner_headers)
+
+    settings = scan_settings(results_per_query, incremental, max_searches)
+    scan_id = None
+    if resume:
+        scan_id = get_scan_queue().latest_open_scan(settings, max_age=SCAN_RESUME_WINDOW)
+    if scan_id:
+        print(f"\nResuming scan {scan_id}")
+    else:
+        scan_id = enqueue_scan(results_per_query, incremental, max_searches)
+
+    run_scan_worker(scan_id, concurrency=concurrency, rate_limit=rate_limit)
+    return merge_scan(scan_id)
+
+
+def run_watch(results_per_query=WATCH_PER_QUERY, calls_per_hour=WATCH_CALLS_PER_HOUR,
+              concurrency=SCAN_CONCURRENCY, rate_limit=SCAN_RATE_LIMIT, max_cycles=None):
+    """
+    Long-running watch mode: poll each search as often as it earns
+
+    Each search is polled incrementally (only new or repriced listings,
+    stopping at the first one already seen). The poll scheduler learns
+    every query's new-listing rate and empty-poll rate and spaces its polls
+    accordingly, so busy queries are checked every few minutes and quiet
+    ones every few hours, all within calls_per_hour. Newly tracked
+    searches are spread over the budget rather than polled all at once.
+    Watch polls keep their own scan marks (WATCH_MARK_PREFIX), apart from
+    --incremental daily scans. New deals are printed and appended to
+    watch_deals_YYYYMMDD.jsonl as they are found.
+
+    Args:
+        results_per_query: Most listings to page through per poll
+        calls_per_hour: eBay call budget for the whole watch loop
+        concurrency: Polls run at once
+        rate_limit: eBay calls per second
+        max_cycles: Stop after this many polling rounds (default: run until
+            interrupted)
+    """
+    print("=" * 60)
+    print(f"DATARADAR - Watch Mode")
+    print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    print(f"Budget: {calls_per_hour} eBay calls/hour")
+    print("=" * 60)
+
+    scheduler = get_poll_scheduler()
+    scheduler.calls_per_hour = calls_per_hour
+    scan_log = get_scan_log()
+    budget = get_quota_budget()
+    history = get_listing_history()
+    matcher = get_target_matcher()
+    limiter = RateLimiter(rate_limit)
+    ensure_pool_size(2 * concurrency)
+
+    def poll_one(query_info):
+        calls = [0]
+        charge = budget.page_charger(query_info['priority'], prepaid=1)
+
+        def before_page():
+            calls[0] += 1
+            return charge() and limiter.wait()
+
+        mark_key = WATCH_MARK_PREFIX + query_info['query']
+        deals, mark, _ = scan_new_listings(query_info['query'], query_info['max_price'], history,
+                                           max_items=results_per_query, before_page=before_page,
+                                           mark_key=mark_key)
+        history.save_scan_mark(mark_key, *mark)
+        return deals, calls[0]
+
+    def on_result(query_info, result):
+        deals, calls = result
+        tag_deals(deals, query_info, matcher)
+        history.record(deals)
+        new_count = sum(1 for deal in deals if deal['change'] == 'new')
+        wait = scheduler.record_poll(query_info['query'], new_count, calls)
+        if not deals:
+            return
+
+        score_deals(deals)
+        try:
+            scan_log.append(deals, scan_id='watch')
+        except OSError as e:
+            print(f"Scan log error: {e}")
+        log_file = BASE_DIR / f"watch_deals_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        with open(log_file, 'a') as f:
+            for deal in deals:
+                f.write(json.dumps(dict(deal, found_at=datetime.now().isoformat())) + '\n')
+        print(f"\n{datetime.now().strftime('%H:%M:%S')} {query_info['query']}: "
+              f"{len(deals)} new/repriced, next poll in {wait / 60:.0f} min")
+        for deal in rank_deals(deals)[:5]:
+            print(f"  {deal['grade'] or '-':<2} ${deal['price']:>7.2f} | {deal['title'][:50]}")
+            print(f"           {deal['url']}")
+
+    searches = {}
+    loaded_at = None
+    cycles = 0
+    try:
+        while max_cycles is None or cycles < max_cycles:
+            # Pick up watchlist changes now and then
+            if loaded_at is None or time.monotonic() - loaded_at >= WATCH_RELOAD_SECONDS:
+                refresh_watchlist(scanner_headers)
+                searches = {s['query']: s for s in build_searches(verbose=False)}
+                added = scheduler.ensure(searches, seed_rate=history.new_listing_rate)
+                scheduler.rebalance(searches)
+                loaded_at = time.monotonic()
+                if added:
+                    print(f"Tracking {len(searches)} searches ({added} new)")
+
+            due = [searches[query] for query in scheduler.due(searches)]
+            if not due:
+                wait = scheduler.seconds_until_due(searches)
+                time.sleep(min(WATCH_IDLE_SECONDS if wait is None else wait + 0.1, WATCH_IDLE_SECONDS))
+                continue
+
+            # Highest priority first when the quota is tight
+            due.sort(key=lambda s: s['priority'])
+            polls = []
+            for query_info in due:
+                if budget.try_acquire(query_info['priority']):
+                    polls.append(query_info)
+                else:
+                    scheduler.postpone(query_info['query'], WATCH_IDLE_SECONDS * 10)
+
+            run_searches(polls, poll_one, on_result, concurrency=concurrency)
+            scale = scheduler.rebalance(searches)
+            if scale > 1:
+                print(f"Over budget: poll intervals stretched x{scale:.1f}")
+            cycles += 1
+    except KeyboardInterrupt:
+        print("\nStopping watch mode")
+
+    print(f"\n{'QUERY':<40} {'NEW/H':>7} {'EMPTY':>6} {'EVERY':>8}")
+    for stat in scheduler.stats(searches)[:20]:
+        print(f"{stat['query'][:40]:<40} {stat['new_per_hour']:>7.2f} {stat['empty_rate']:>6.0%} "
+              f"{stat['interval_seconds'] / 60:>6.0f} m")
+    return scheduler.stats(searches)
+
+
+def parse_shards(spec, total):
+    """'i/n' -> the shard numbers (of total) served by worker i of n"""
+    index, count = (int(part) for part in spec.split('/'))
+    return [shard for shard in range(total) if shard % count == index]
+
+
 if __name__ == "__main__":
-    run_daily_scan()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DATARADAR daily deal scanner')
+    parser.add_argument('--per-query', type=int, default=None,
+                        help=f'listings to collect per search (default: 5, or {WATCH_PER_QUERY} '
+                             f'per poll with --watch)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='report only listings new or repriced since the last incremental scan')
+    parser.add_argument('--max-searches', type=int, default=None,
+                        help='maximum searches per scan (default: all)')
+    parser.add_argument('--concurrency', type=int, default=SCAN_CONCURRENCY,
+                        help=f'searches run at once (default: {SCAN_CONCURRENCY})')
+    parser.add_argument('--rate-limit', type=float, default=SCAN_RATE_LIMIT,
+                        help=f'eBay calls per second (default: {SCAN_RATE_LIMIT})')
+    parser.add_argument('--no-resume', action='store_true',
+                        help='start a new scan even if an unfinished one exists')
+    parser.add_argument('--refresh-watchlist', action='store_true',
+                        help='only check watchlist listings by item id (price, sold, ended)')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep polling, each search as often as it gets new listings')
+    parser.add_argument('--calls-per-hour', type=int, default=WATCH_CALLS_PER_HOUR,
+                        help=f'eBay call budget in watch mode (default: {WATCH_CALLS_PER_HOUR})')
+
+    # Distributed scans: queue once, run workers anywhere sharing the queue, merge
+    parser.add_argument('--enqueue', action='store_true', help='queue a scan and print its id')
+    parser.add_argument('--worker', action='store_true', help='work on a queued scan')
+    parser.add_argument('--merge', action='store_true', help='write the results of a queued scan')
+    parser.add_argument('--scan', help='scan id (default: the newest unmerged scan)')
+    parser.add_argument('--shard', help='serve only shard i of n, e.g. 0/4')
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS,
+                        help=f'shards per queued scan (default: {DEFAULT_SHARDS})')
+    parser.add_argument('--force', action='store_true', help='merge even if jobs are unfinished')
+    args = parser.parse_args()
+    if args.per_query is None:
+        args.per_query = WATCH_PER_QUERY if args.watch else 5
+
+    if args.refresh_watchlist:
+        refresh_watchlist(scanner_headers, force=True)
+    elif args.watch:
+        run_watch(results_per_query=args.per_query, calls_per_hour=args.calls_per_hour,
+                  concurrency=args.concurrency, rate_limit=args.rate_limit)
+    elif args.enqueue:
+        enqueue_scan(results_per_query=args.per_query, incremental=args.incremental,
+                     max_searches=args.max_searches, shards=args.shards)
+    elif args.worker or args.merge:
+        scan_id = args.scan or get_scan_queue().latest_open_scan()
+        if not scan_id:
+            raise SystemExit("No unmerged scan in the queue")
+        if args.worker:
+            shards = None
+            if args.shard:
+                shards = parse_shards(args.shard, get_scan_queue().scan(scan_id)['shards'])
+            run_scan_worker(scan_id, concurrency=args.concurrency, rate_limit=args.rate_limit,
+                            shards=shards)
+        else:
+            merge_scan(scan_id, force=args.force)
+    else:
+        run_daily_scan(results_per_query=args.per_query, incremental=args.incremental,
+                       max_searches=args.max_searches, concurrency=args.concurrency,
+                       rate_limit=args.rate_limit, resume=not args.no_resume)
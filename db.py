@@ -0,0 +1,50 @@
+"""
+DATARADAR - SQLite Helpers
+Per-thread connections in WAL mode, shared by the local stores
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Seconds a writer waits for another process's lock before giving up
+DB_BUSY_TIMEOUT = 10
+
+
+class SQLiteDB:
+    """
+    One SQLite connection per thread, opened lazily in WAL mode
+
+    wal=False keeps the default rollback journal, for database files on a
+    network share (WAL needs every process on the same host).
+    """
+
+    def __init__(self, db_path, schema=None, wal=True):
+        self.db_path = str(db_path)
+        self.wal = wal
+        self._local = threading.local()
+        if schema:
+            self.conn().executescript(schema)
+
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT,
+                                   isolation_level=None)
+            if self.wal:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, so read-modify-write cycles never interleave"""
+        conn = self.conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
@@ -0,0 +1,203 @@
+"""
+DATARADAR - Listing De-duplication
+Collapses repeated listings across overlapping target queries: exact item
+ids, plus near-identical titles from the same seller (relistings) found
+through a MinHash / LSH index instead of comparing every pair
+"""
+
+import random
+import re
+import time
+import zlib
+from array import array
+from functools import lru_cache
+
+from db import SQLiteDB
+
+# MinHash signature = BANDS x ROWS hashes. With 16 bands of 4 rows, pairs
+# at Jaccard 0.8 become candidates with >99.9% probability
+BANDS = 16
+ROWS = 4
+NUM_HASHES = BANDS * ROWS
+
+# Estimated title similarity (Jaccard over character shingles) to count as a duplicate
+SIMILARITY_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+
+# Sellers we can't tell apart only get exact-id de-duplication
+_ANONYMOUS_SELLERS = {'', 'unknown'}
+
+# Listings not seen for this long are dropped from a persistent index
+# (seconds); a relisting after that counts as a new listing
+DEDUP_RETENTION = 90 * 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedup_items (
+    item_id TEXT PRIMARY KEY,
+    cluster TEXT NOT NULL,
+    signature BLOB,
+    seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dedup_bands (
+    band TEXT NOT NULL,
+    item_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dedup_band ON dedup_bands (band);
+CREATE INDEX IF NOT EXISTS idx_dedup_seen ON dedup_items (seen_at);
+"""
+
+
+def normalize_title(title):
+    return ' '.join(re.findall(r'[a-z0-9]+', (title or '').lower()))
+
+
+def minhash(title):
+    """MinHash signature of a title's character shingles"""
+    return array('Q', _signature(normalize_title(title)))
+
+
+@lru_cache(maxsize=4096)
+def _signature(text):
+    # Relistings and overlapping queries repeat titles verbatim, so cache by text
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashed = [zlib.crc32(s.encode()) for s in shingles]
+
+    return tuple(min((a * x + b) % _PRIME for x in hashed) for a, b in _HASH_PARAMS)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_HASHES
+
+
+def _band_keys(seller, signature):
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        keys.append(f"{seller}|{band}|{zlib.crc32(rows.tobytes())}")
+    return keys
+
+
+class DedupIndex:
+    """
+    Maps listings to duplicate clusters, incrementally
+
+    A cluster id is the item id of the first listing seen in it. The index
+    lives in SQLite, so a persistent index keeps recognizing relistings
+    across scanner runs; purge() keeps it to recently seen listings. Use
+    ':memory:' for a throwaway, single-thread index.
+    """
+
+    def __init__(self, db_path=':memory:'):
+        self.db = SQLiteDB(db_path, SCHEMA)
+
+    def assign(self, deals):
+        """
+        Assign each deal to a cluster, adding new listings to the index
+
+        Returns:
+            List of cluster ids, parallel to deals
+        """
+        clusters = []
+        now = time.time()
+        with self.db.transaction() as conn:
+            for deal in deals:
+                clusters.append(self._assign(conn, deal, now))
+        return clusters
+
+    def purge(self, retention=DEDUP_RETENTION):
+        """
+        Drop listings not seen for retention seconds, with their band keys
+
+        Returns:
+            Number of listings dropped
+        """
+        cutoff = time.time() - retention
+        with self.db.transaction() as conn:
+            conn.execute(
+                'DELETE FROM dedup_bands WHERE item_id IN '
+                '(SELECT item_id FROM dedup_items WHERE seen_at < ?)', (cutoff,)
+            )
+            cursor = conn.execute('DELETE FROM dedup_items WHERE seen_at < ?', (cutoff,))
+        return cursor.rowcount
+
+    def _assign(self, conn, deal, now):
+        item_id = deal.get('id') or ''
+        row = conn.execute('SELECT cluster FROM dedup_items WHERE item_id = ?', (item_id,)).fetchone()
+        if row:
+            conn.execute('UPDATE dedup_items SET seen_at = ? WHERE item_id = ?', (now, item_id))
+            return row[0]
+
+        seller = (deal.get('seller') or '').lower()
+        if seller in _ANONYMOUS_SELLERS:
+            conn.execute('INSERT INTO dedup_items (item_id, cluster, seen_at) VALUES (?, ?, ?)',
+                         (item_id, item_id, now))
+            return item_id
+
+        signature = minhash(deal.get('title'))
+        bands = _band_keys(seller, signature)
+
+        # Candidates share at least one LSH band; verify on the full signature
+        placeholders = ','.join('?' * len(bands))
+        candidates = conn.execute(
+            'SELECT DISTINCT i.cluster, i.signature FROM dedup_bands b '
+            f'JOIN dedup_items i ON i.item_id = b.item_id WHERE b.band IN ({placeholders})',
+            bands
+        ).fetchall()
+
+        cluster, best = item_id, SIMILARITY_THRESHOLD
+        for candidate_cluster, candidate_sig in candidates:
+            score = similarity(signature, array('Q', candidate_sig))
+            if score >= best:
+                cluster, best = candidate_cluster, score
+
+        conn.execute('INSERT INTO dedup_items (item_id, cluster, signature, seen_at) VALUES (?, ?, ?, ?)',
+                     (item_id, cluster, signature.tobytes(), now))
+        conn.executemany('INSERT INTO dedup_bands (band, item_id) VALUES (?, ?)',
+                         [(band, item_id) for band in bands])
+        return cluster
+
+
+def dedupe(deals, index=None):
+    """
+    Collapse duplicate listings, keeping the first of each cluster
+
+    Rank deals before calling so the best listing of each cluster survives.
+    A surviving deal lists the ids it absorbed under 'duplicates'. If it
+    matched a listing from an earlier run (a relisting), 'relist_of' holds
+    that listing's id.
+
+    Args:
+        deals: List of deal dicts with 'id', 'title' and 'seller'
+        index: DedupIndex to use (default: a fresh in-memory one)
+
+    Returns:
+        New list of unique deals
+    """
+    if not deals:
+        return []
+
+    index = index or DedupIndex()
+    clusters = index.assign(deals)
+
+    kept = {}
+    unique = []
+    for deal, cluster in zip(deals, clusters):
+        if cluster in kept:
+            survivor = kept[cluster]
+            duplicates = survivor.setdefault('duplicates', [])
+            if deal.get('id') != survivor.get('id') and deal.get('id') not in duplicates:
+                duplicates.append(deal.get('id'))
+            continue
+        if cluster != deal.get('id'):
+            deal['relist_of'] = cluster
+        kept[cluster] = deal
+        unique.append(deal)
+    return unique
@@ -0,0 +1,485 @@
+"""
+DATARADAR - Shared eBay API Helpers
+Shared HTTP transport and token manager for all eBay traffic
+"""
+
+import base64
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import EBAY_REQUEST_SECONDS, EBAY_REQUESTS, TOKEN_REFRESHES
+
+# Base URL for eBay REST calls; set EBAY_API_BASE (environment or .env) to
+# point at fake_ebay.py. Read on every call, see api_url()
+DEFAULT_API_BASE = 'https://api.ebay.com'
+
+# eBay OAuth endpoint and scope for the client-credentials (application) grant
+EBAY_TOKEN_PATH = '/identity/v1/oauth2/token'
+BROWSE_SCOPE = 'https://api.ebay.com/oauth/api_scope'
+
+# Browse API item search; pages hold at most 200 items and offset stops at 10,000
+BROWSE_SEARCH_PATH = '/buy/browse/v1/item_summary/search'
+BROWSE_MAX_PAGE_SIZE = 200
+
+# Browse getItems: up to 20 item ids per request
+BROWSE_ITEMS_PATH = '/buy/browse/v1/item/'
+BROWSE_ITEMS_BATCH = 20
+BROWSE_MAX_OFFSET = 10000
+
+# Refresh this many seconds before the token's expires_in runs out
+TOKEN_REFRESH_MARGIN = 300
+
+# Retry delay for the background refresher after a failed fetch
+TOKEN_RETRY_DELAY = 30
+
+# Seconds a worker waits for another worker's token fetch (shared cache only)
+TOKEN_SHARED_WAIT = 15
+
+# HTTP transport: pooled keep-alive connections, (connect, read) timeouts,
+# and bounded retries with jittered exponential backoff on 429/5xx
+HTTP_POOL_SIZE = 16
+HTTP_TIMEOUT = (3.05, 10)
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_BASE = 0.5
+HTTP_BACKOFF_MAX = 10
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# =============================================================================
+# HTTP Transport
+# =============================================================================
+
+_api_base = None
+
+
+def set_api_base(base):
+    """Fallback base URL (e.g. EBAY_API_BASE from app's .env) when the environment has none"""
+    global _api_base
+    _api_base = base or None
+
+
+def api_url(path):
+    """
+    Full URL for an eBay API path
+
+    The base is looked up on each call, so EBAY_API_BASE loaded from .env
+    after this module was imported still applies. The process environment
+    wins over set_api_base(), which wins over DEFAULT_API_BASE.
+    """
+    base = os.environ.get('EBAY_API_BASE') or _api_base or DEFAULT_API_BASE
+    return base.rstrip('/') + path
+
+
+_session = None
+_session_lock = threading.Lock()
+_pool_size = HTTP_POOL_SIZE
+
+
+def _mount_adapter(session, pool_size):
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+
+def get_session():
+    """Return the shared keep-alive session used for all eBay traffic"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            _mount_adapter(session, _pool_size)
+            _session = session
+        return _session
+
+
+def ensure_pool_size(size):
+    """
+    Grow the shared session's connection pool to at least size
+
+    For callers that run many requests at once (the concurrent scanner),
+    so connections beyond HTTP_POOL_SIZE are kept alive instead of being
+    opened and discarded per request.
+    """
+    global _pool_size
+    session = get_session()
+    with _session_lock:
+        if size <= _pool_size:
+            return
+        _pool_size = size
+        _mount_adapter(session, size)
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header, or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+def endpoint_label(url):
+    """Metrics label for an eBay URL: its path, with item ids collapsed"""
+    segments = urlparse(url).path.split('/')
+    return '/'.join(':id' if '|' in s or s.isdigit() and len(s) > 3 else s for s in segments)
+
+
+def _record_call(endpoint, status, started):
+    EBAY_REQUESTS.inc(endpoint=endpoint, status=status)
+    EBAY_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
+
+
+def ebay_request(method, url, max_retries=HTTP_MAX_RETRIES, **kwargs):
+    """
+    Send a request through the shared session, retrying transient failures
+
+    Retries connection errors, timeouts and RETRY_STATUSES responses up to
+    max_retries times, honoring Retry-After (capped at HTTP_BACKOFF_MAX).
+
+    Returns:
+        The final requests.Response (which may still be a 429/5xx)
+
+    Raises:
+        requests.RequestException if the last attempt failed to connect
+    """
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    session = get_session()
+    endpoint = endpoint_label(url)
+
+    for attempt in range(max_retries + 1):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            status = 'timeout' if isinstance(e, requests.Timeout) else 'connection_error'
+            _record_call(endpoint, status, started)
+            if attempt == max_retries:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+        _record_call(endpoint, response.status_code, started)
+
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return response
+
+        delay = _retry_after(response)
+        if delay is None:
+            delay = _backoff(attempt)
+        response.close()
+        time.sleep(min(delay, HTTP_BACKOFF_MAX))
+
+
+def ebay_get(url, **kwargs):
+    """GET through ebay_request"""
+    return ebay_request('GET', url, **kwargs)
+
+
+def ebay_post(url, **kwargs):
+    """POST through ebay_request"""
+    return ebay_request('POST', url, **kwargs)
+
+# =============================================================================
+# Browse API Pagination
+# =============================================================================
+
+
+def _fetch_page(url, params, get_headers):
+    """Fetch one search page, returning the decoded body or None on error"""
+    response = ebay_get(url, headers=get_headers(), params=params)
+    if response.status_code != 200:
+        print(f"eBay API error: {response.status_code}")
+        return None
+    return response.json()
+
+
+def iter_browse_search(params, get_headers, page_size=50, before_page=None, max_items=None,
+                       prefetch=True):
+    """
+    Lazily iterate Browse API item summaries across result pages
+
+    Follows the response's `next` link page by page. While the caller works
+    through one page, the next page is already being fetched in the
+    background, unless the pages so far already hold max_items results; then
+    the next page is only requested if the caller reads past them (e.g.
+    because it filtered some out). At most one page is held beyond the
+    current one, so callers can stop at any point (break, or close the
+    generator) without loading the remaining results.
+
+    Args:
+        params: Search query params (q, filter, sort, ...) without limit/offset
+        get_headers: Callable returning request headers, called per page so a
+            refreshed token is picked up mid-scan
+        page_size: Items per page (capped at BROWSE_MAX_PAGE_SIZE)
+        before_page: Optional callable run before each page request; return
+            False to stop (e.g. when the call quota is exhausted)
+        max_items: Results the caller expects to need (None = unknown)
+        prefetch: False to request every page only on demand, for callers
+            that usually stop within the first page (incremental scans)
+
+    Yields:
+        Raw itemSummaries dicts
+
+    Returns:
+        True if iteration ran out of results, False if a page request
+        failed or was refused by before_page (the generator's return value)
+    """
+    page_size = max(1, min(page_size, BROWSE_MAX_PAGE_SIZE))
+
+    def request(url, page_params):
+        if before_page and before_page() is False:
+            return None
+        return _fetch_page(url, page_params, get_headers)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        pending = executor.submit(request, api_url(BROWSE_SEARCH_PATH),
+                                  dict(params, limit=page_size, offset=0))
+        fetched = 0
+        while pending is not None:
+            data = pending.result()
+            if not data:
+                return False
+            items = data.get('itemSummaries', [])
+            fetched += len(items)
+
+            # `next` already carries q, filter, limit and the new offset
+            next_url = data.get('next')
+            next_offset = data.get('offset', 0) + data.get('limit', page_size)
+            if not next_url or next_offset >= BROWSE_MAX_OFFSET:
+                pending = None
+                yield from items
+            elif prefetch and (max_items is None or fetched < max_items):
+                pending = executor.submit(request, next_url, None)
+                yield from items
+            else:
+                yield from items
+                # Still iterating: the caller needs more than it expected
+                pending = executor.submit(request, next_url, None)
+        return True
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_items(item_ids, get_headers):
+    """
+    Look up to BROWSE_ITEMS_BATCH items by RESTful item id in one request
+
+    Items that no longer exist (ended, or removed by eBay) are simply
+    absent from the result.
+
+    Returns:
+        Dict of item id -> Browse item, or None if the request failed
+    """
+    response = ebay_get(api_url(BROWSE_ITEMS_PATH), headers=get_headers(),
+                        params={'item_ids': ','.join(item_ids[:BROWSE_ITEMS_BATCH])})
+    if response.status_code != 200:
+        print(f"eBay API error: {response.status_code}")
+        return None
+    return {item['itemId']: item for item in response.json().get('items', []) if item.get('itemId')}
+
+# =============================================================================
+# Application Token Manager
+# =============================================================================
+
+
+class AppTokenManager:
+    """
+    Caches an eBay client-credentials token for its expires_in lifetime
+
+    The token is refreshed in a background timer shortly before it expires.
+    If a caller finds no valid token, it performs the fetch itself while any
+    other concurrent callers wait on that same fetch instead of starting their own.
+
+    With a `shared` SharedCache, worker processes reuse one token: a refresh
+    first adopts a fresh token another worker stored, and only the worker
+    holding the refresh lease calls eBay.
+    """
+
+    def __init__(self, client_id, client_secret, scope=BROWSE_SCOPE,
+                 refresh_margin=TOKEN_REFRESH_MARGIN, shared=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.refresh_margin = refresh_margin
+        self.shared = shared
+        digest = hashlib.sha256(f'{client_id}|{scope}'.encode()).hexdigest()[:16]
+        self._shared_key = f'token:{digest}'
+
+        self._cond = threading.Condition()
+        self._token = None
+        self._expires_at = 0.0
+        self._refreshing = False
+        self._timer = None
+
+    def get_token(self):
+        """Return a valid access token, fetching one only if none is cached"""
+        if not self.client_id or not self.client_secret:
+            return None
+
+        with self._cond:
+            while True:
+                if self._token and time.monotonic() < self._expires_at:
+                    return self._token
+                if not self._refreshing:
+                    self._refreshing = True
+                    break
+                self._cond.wait()
+
+        return self._refresh()
+
+    def invalidate(self):
+        """Drop the cached token, e.g. after eBay rejects it with a 401"""
+        with self._cond:
+            rejected = self._token
+            self._token = None
+            self._expires_at = 0.0
+
+        if self.shared is not None and rejected:
+            entry = self.shared.get(self._shared_key)
+            if entry and entry[0]['access_token'] == rejected:
+                self.shared.delete(self._shared_key)
+
+    def _refresh(self):
+        """Fetch a new token and wake up any callers waiting on it"""
+        token, expires_in, source = None, 0, 'error'
+        try:
+            token, expires_in, source = self._obtain()
+        except Exception as e:
+            print(f"Token refresh error: {e}")
+        finally:
+            TOKEN_REFRESHES.inc(result=source if token else 'error')
+            with self._cond:
+                if token:
+                    self._token = token
+                    self._expires_at = time.monotonic() + expires_in
+                self._refreshing = False
+                self._cond.notify_all()
+
+        if token:
+            self._schedule(max(expires_in - self.refresh_margin, 1))
+        elif self._token:
+            # Old token is still usable - try again shortly
+            self._schedule(TOKEN_RETRY_DELAY)
+        return token or self._current()
+
+    def _current(self):
+        with self._cond:
+            if self._token and time.monotonic() < self._expires_at:
+                return self._token
+        return None
+
+    def _background_refresh(self):
+        with self._cond:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        self._refresh()
+
+    def _schedule(self, delay):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _obtain(self):
+        """
+        A new token as (access_token, expires_in, source)
+
+        source is 'ok' when fetched from eBay and 'shared' when another
+        worker's token was reused.
+        """
+        if self.shared is None:
+            return (*self._fetch(), 'ok')
+
+        def usable(entry):
+            if entry is None:
+                return None
+            remaining = entry[0]['expires_at'] - time.time()
+            return int(remaining) if remaining > self.refresh_margin else None
+
+        entry = self.shared.get(self._shared_key)
+        if usable(entry):
+            return entry[0]['access_token'], usable(entry), 'shared'
+
+        lease = f'{self._shared_key}:refresh'
+        if not self.shared.acquire_lease(lease, TOKEN_SHARED_WAIT):
+            entry = self.shared.wait_for(self._shared_key, TOKEN_SHARED_WAIT,
+                                         newer_than=entry[1] if entry else 0.0)
+            if usable(entry):
+                return entry[0]['access_token'], usable(entry), 'shared'
+        try:
+            token, expires_in = self._fetch()
+            if token:
+                self.shared.set(self._shared_key,
+                                {'access_token': token, 'expires_at': time.time() + expires_in},
+                                expires_in)
+            return token, expires_in, 'ok'
+        finally:
+            self.shared.release_lease(lease)
+
+    def _fetch(self):
+        """POST to the OAuth endpoint, returning (access_token, expires_in)"""
+        credentials = f"{self.client_id}:{self.client_secret}"
+        encoded_creds = base64.b64encode(credentials.encode()).decode()
+
+        response = ebay_post(
+            api_url(EBAY_TOKEN_PATH),
+            headers={
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Authorization': f'Basic {encoded_creds}'
+            },
+            data={
+                'grant_type': 'client_credentials',
+                'scope': self.scope
+            }
+        )
+
+        if response.status_code != 200:
+            print(f"eBay token error: {response.status_code}")
+            return None, 0
+
+        data = response.json()
+        return data.get('access_token'), int(data.get('expires_in', 7200))
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+_shared_cache = None
+
+
+def use_shared_cache(shared):
+    """Share token state across worker processes through a SharedCache"""
+    global _shared_cache
+    with _managers_lock:
+        _shared_cache = shared
+        for manager in _managers.values():
+            manager.shared = shared
+
+
+def get_token_manager(client_id, client_secret, scope=BROWSE_SCOPE):
+    """Return the shared token manager for a set of credentials"""
+    key = (client_id, client_secret, scope)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = AppTokenManager(client_id, client_secret, scope, shared=_shared_cache)
+        return _managers[key]
@@ -9,9 +9,10 @@ import base64
 import webbrowser
 from urllib.parse import urlencode, parse_qs, urlparse
 from http.server import HTTPServer, BaseHTTPRequestHandler
-import requests
 from dotenv import load_dotenv
 
+from ebay_api import ebay_post
+
 load_dotenv()
 
 # eBay OAuth endpoints
@@ -90,7 +91,9 @@ def exchange_code_for_tokens(code: str, client_id: str, client_secret: str, sand
         'redirect_uri': REDIRECT_URI
     }
 
-    response = requests.post(token_url, headers=headers, data=data)
+    # The code is single-use: a retry after eBay already accepted it would
+    # only fail with invalid_grant and hide the real outcome
+    response = ebay_post(token_url, headers=headers, data=data, max_retries=0)
     return response.json()
 
 
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+DATARADAR - Offline eBay Server
+Local stand-in for the eBay OAuth token endpoint and the Browse API item
+search and item lookup, for running and timing the app and scanner without credentials
+
+Usage:
+    python fake_ebay.py --port 8765 --latency 0.15 --error-rate 0.02
+    EBAY_API_BASE=http://127.0.0.1:8765 python app.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse
+
+TOKEN_PATH = '/identity/v1/oauth2/token'
+SEARCH_PATH = '/buy/browse/v1/item_summary/search'
+ITEMS_PATH = '/buy/browse/v1/item/'
+
+# Listings generated per deal target when no fixtures are given
+ITEMS_PER_TARGET = 40
+
+_TITLE_EXTRAS = ['Authentic', 'Rare', 'Framed', 'COA', 'JSA', 'PSA', 'BAS', 'Limited Edition',
+                 'Vintage', 'Original', 'Certified', '1/100', 'Hand Signed', 'Lot', 'Mint']
+_CONDITIONS = ['New', 'Used', 'Like New', 'Pre-owned']
+
+_PRICE_RE = re.compile(r'price:\[([\d.]*)\.\.([\d.]*)\]')
+
+
+def load_fixtures(path):
+    """
+    Load recorded item summaries from a JSON file, or every *.json in a directory
+
+    A file may hold a list of item summaries or a saved Browse API
+    response ({"itemSummaries": [...]}).
+    """
+    path = Path(path)
+    files = sorted(path.glob('*.json')) if path.is_dir() else [path]
+    items = []
+    for file in files:
+        with open(file, 'r') as f:
+            data = json.load(f)
+        items.extend(data.get('itemSummaries', []) if isinstance(data, dict) else data)
+    return items
+
+
+def generate_catalog(targets, items_per_target=ITEMS_PER_TARGET, seed=1729):
+    """
+    Deterministic synthetic listings for each deal target
+
+    Titles extend the target's query, prices spread around its price band and
+    creation dates over the last 30 days, so every target finds matches.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    sellers = [f'seller_{i:02d}' for i in range(40)]
+    items = []
+    for target in targets:
+        low = target.get('min_price', 0)
+        high = target.get('max_price', 500)
+        for _ in range(items_per_target):
+            n = len(items)
+            extras = ' '.join(rng.sample(_TITLE_EXTRAS, rng.randint(1, 3)))
+            created = now - timedelta(minutes=rng.randint(0, 30 * 24 * 60))
+            items.append({
+                'itemId': f'v1|{100000000000 + n}|0',
+                'title': f"{target['query']} {extras}",
+                'price': {'value': f'{rng.uniform(low * 0.5, high * 1.3):.2f}', 'currency': 'USD'},
+                'image': {'imageUrl': f'https://i.ebayimg.com/images/g/fake{n}/s-l225.jpg'},
+                'itemWebUrl': f'https://www.ebay.com/itm/{100000000000 + n}',
+                'condition': rng.choice(_CONDITIONS),
+                'seller': {'username': rng.choice(sellers)},
+                'buyingOptions': [rng.choice(['FIXED_PRICE', 'AUCTION'])],
+                'itemLocation': {'country': 'US'},
+                'itemCreationDate': created.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            })
+    return items
+
+
+def _tokens(text):
+    return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+
+class FakeEbayServer:
+    """
+    Threaded HTTP server imitating the eBay endpoints the app uses
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        items: Item summaries to search (default: generated from the deal targets)
+        latency: Seconds added to every response
+        jitter: Up to this many extra random seconds per response
+        error_rate: Fraction of search requests answered with a 503
+        max_page_size: Largest page returned, like eBay's 200
+    """
+
+    def __init__(self, port=0, items=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 max_page_size=200):
+        if items is None:
+            from target_matcher import get_target_matcher
+            items = generate_catalog(get_target_matcher().targets)
+
+        self.items = items
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_page_size = max_page_size
+        self.stats = {'tokens': 0, 'searches': 0, 'lookups': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        self._rng = random.Random()
+        self._titles = [set(_tokens(item.get('title'))) for item in items]
+        # Item lookups by id; delete an entry to simulate an ended listing
+        self.by_id = {item['itemId']: item for item in items if item.get('itemId')}
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.httpd.server_port}'
+
+    def start(self):
+        """Serve on a background thread; returns the base URL"""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _delay(self):
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    @lru_cache(maxsize=1024)
+    def _matches(self, q, min_price, max_price, sort):
+        """Indexes of matching items, in result order"""
+        words = _tokens(q)
+        hits = []
+        for i, (item, title) in enumerate(zip(self.items, self._titles)):
+            price = float(item.get('price', {}).get('value', 0))
+            if price < min_price or price > max_price:
+                continue
+            # Every query word must start a title word, like eBay's keyword match
+            if all(any(t.startswith(w) for t in title) for w in words):
+                hits.append(i)
+
+        if sort == 'newlyListed':
+            hits.sort(key=lambda i: self.items[i].get('itemCreationDate', ''), reverse=True)
+        elif sort == '-price':
+            hits.sort(key=lambda i: -float(self.items[i]['price']['value']))
+        elif sort == 'price':
+            hits.sort(key=lambda i: float(self.items[i]['price']['value']))
+        return tuple(hits)
+
+    def search(self, params):
+        """Browse API search response body for parsed query params"""
+        q = params.get('q', '')
+        limit = max(1, min(int(params.get('limit', 50)), self.max_page_size))
+        offset = int(params.get('offset', 0))
+
+        min_price, max_price = 0.0, float('inf')
+        match = _PRICE_RE.search(params.get('filter', ''))
+        if match:
+            min_price = float(match.group(1) or 0)
+            max_price = float(match.group(2) or 'inf')
+
+        hits = self._matches(q, min_price, max_price, params.get('sort', ''))
+        body = {
+            'href': f'{self.base_url}{SEARCH_PATH}?{urlencode(params)}',
+            'total': len(hits),
+            'limit': limit,
+            'offset': offset,
+            'itemSummaries': [self.items[i] for i in hits[offset:offset + limit]]
+        }
+        if offset + limit < len(hits):
+            body['next'] = f'{self.base_url}{SEARCH_PATH}?' + urlencode(dict(params, offset=offset + limit,
+                                                                             limit=limit))
+        return body
+
+    def get_items(self, params):
+        """Browse API getItems response body: known items, a warning for the rest"""
+        ids = [i for i in params.get('item_ids', '').split(',') if i]
+        found = [dict(self.by_id[i], estimatedAvailabilities=[{'estimatedAvailabilityStatus': 'IN_STOCK'}])
+                 for i in ids if i in self.by_id]
+        body = {'items': found}
+        missing = [i for i in ids if i not in self.by_id]
+        if missing:
+            body['warnings'] = [{'errorId': 11001, 'message': 'The item is not available.',
+                                 'parameters': [{'name': 'itemIds', 'value': ','.join(missing)}]}]
+        return body
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out as separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode())
+                server._delay()
+
+                if urlparse(self.path).path != TOKEN_PATH:
+                    return self._send(404, {'errors': [{'message': 'Not found'}]})
+                if form.get('grant_type', [''])[0] != 'client_credentials':
+                    return self._send(400, {'error': 'unsupported_grant_type'})
+
+                server._count('tokens')
+                self._send(200, {
+                    'access_token': f'fake-app-token-{int(time.time())}',
+                    'expires_in': 7200,
+                    'token_type': 'Application Access Token'
+                })
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                server._delay()
+
+                if url.path not in (SEARCH_PATH, ITEMS_PATH):
+                    return self._send(404, {'errors': [{'message': 'Not found'}]})
+                if not self.headers.get('Authorization', '').startswith('Bearer fake-app-token'):
+                    return self._send(401, {'errors': [{'message': 'Invalid access token'}]})
+
+                server._count('searches' if url.path == SEARCH_PATH else 'lookups')
+                if server.error_rate and server._rng.random() < server.error_rate:
+                    server._count('errors')
+                    return self._send(503, {'errors': [{'message': 'Service unavailable'}]},
+                                      {'Retry-After': '1'})
+
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == ITEMS_PATH:
+                    return self._send(200, server.get_items(params))
+                self._send(200, server.search(params))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline eBay OAuth and Browse search server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', help='JSON file or directory of recorded item summaries')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random seconds, up to this')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of searches failing with 503')
+    parser.add_argument('--page-size', type=int, default=200, help='Largest page returned')
+    args = parser.parse_args()
+
+    fake = FakeEbayServer(
+        port=args.port,
+        items=load_fixtures(args.fixtures) if args.fixtures else None,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        max_page_size=args.page_size
+    )
+    print(f"Fake eBay serving {len(fake.items)} listings at {fake.base_url}")
+    print(f"Run the app with EBAY_API_BASE={fake.base_url}")
+    try:
+        fake.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -5,11 +5,13 @@ Run this to verify all systems are working
 """
 
 import os
-import base64
 import requests
 from pathlib import Path
 from dotenv import load_dotenv
 
+from ebay_api import get_token_manager
+from watchlist_store import get_watchlist_store
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).parent
@@ -40,9 +42,15 @@ def run_health_check():
     if not creds_ok:
         issues.append("Set EBAY_CLIENT_ID and EBAY_CLIENT_SECRET in .env")
 
-    # 3. Check watchlist file
-    watchlist_ok = (BASE_DIR / 'watchlist.json').exists()
-    print(f"[{check_mark(watchlist_ok)}] watchlist.json exists")
+    # 3. Check watchlist store
+    watchlist_ok = False
+    try:
+        count = get_watchlist_store().count()
+        watchlist_ok = True
+        print(f"[{check_mark(watchlist_ok)}] Watchlist store ({count} items)")
+    except Exception as e:
+        print(f"[{check_mark(False)}] Watchlist store - {e}")
+        issues.append("Check watchlist.db is readable and writable")
 
     # 4. Check web app running
     webapp_ok = False
@@ -58,22 +66,8 @@ def run_health_check():
     ebay_ok = False
     if creds_ok:
         try:
-            creds = f"{client_id}:{client_secret}"
-            encoded = base64.b64encode(creds.encode()).decode()
-
-            resp = requests.post(
-                'https://api.ebay.com/identity/v1/oauth2/token',
-                headers={
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'Authorization': f'Basic {encoded}'
-                },
-                data={
-                    'grant_type': 'client_credentials',
-                    'scope': 'https://api.ebay.com/oauth/api_scope'
-                },
-                timeout=10
-            )
-            ebay_ok = resp.status_code == 200
+            token = get_token_manager(client_id, client_secret).get_token()
+            ebay_ok = token is not None
             print(f"[{check_mark(ebay_ok)}] eBay API connection")
         except Exception as e:
             print(f"[{check_mark(False)}] eBay API - {e}")
@@ -0,0 +1,248 @@
+"""
+DATARADAR - Listing History Store
+Every listing the scanner observes, appended to SQLite and indexed by
+item id, category and time so months of scans stay queryable
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from db import SQLiteDB
+
+BASE_DIR = Path(__file__).parent
+
+HISTORY_DB = BASE_DIR / 'listing_history.db'
+
+# listings holds the latest known state of each item; observations keeps
+# every sighting, so price changes over time are never overwritten
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    item_id TEXT PRIMARY KEY,
+    title TEXT,
+    url TEXT,
+    seller TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_price REAL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    item_id TEXT NOT NULL,
+    observed_at REAL NOT NULL,
+    price REAL NOT NULL,
+    seller TEXT,
+    query TEXT,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_obs_item_time ON observations (item_id, observed_at);
+CREATE INDEX IF NOT EXISTS idx_obs_category_time ON observations (category, observed_at);
+CREATE INDEX IF NOT EXISTS idx_obs_time ON observations (observed_at);
+CREATE INDEX IF NOT EXISTS idx_obs_query_time ON observations (query, observed_at);
+CREATE TABLE IF NOT EXISTS scan_marks (
+    query TEXT PRIMARY KEY,
+    high_water TEXT,
+    seen TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Recently seen item ids (with price) remembered per query for incremental scans
+SEEN_IDS_PER_QUERY = 1000
+
+
+def _to_timestamp(value):
+    """Accept epoch seconds, datetimes or ISO strings"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ListingHistory:
+    """Append-only listing observations with a latest-state table per item"""
+
+    def __init__(self, db_path=HISTORY_DB):
+        self.db = SQLiteDB(db_path, SCHEMA)
+
+    def record(self, deals, observed_at=None):
+        """
+        Append one observation per deal in a single transaction
+
+        Args:
+            deals: Scanner deal dicts (id, title, price, url, seller,
+                search_query, source)
+            observed_at: When the deals were seen (default: now)
+
+        Returns:
+            Number of observations written
+        """
+        observed_at = _to_timestamp(observed_at) or time.time()
+        rows = [d for d in deals if d.get('id')]
+        if not rows:
+            return 0
+
+        with self.db.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO observations (item_id, observed_at, price, seller, query, category) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(d['id'], observed_at, d['price'], d.get('seller'),
+                  d.get('search_query'), d.get('source')) for d in rows]
+            )
+            conn.executemany(
+                'INSERT INTO listings (item_id, title, url, seller, first_seen, last_seen, last_price) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(item_id) DO UPDATE SET title = excluded.title, url = excluded.url, '
+                'seller = excluded.seller, last_seen = excluded.last_seen, '
+                'last_price = excluded.last_price',
+                [(d['id'], d.get('title'), d.get('url'), d.get('seller'),
+                  observed_at, observed_at, d['price']) for d in rows]
+            )
+        return len(rows)
+
+    def observations(self, item_id=None, category=None, since=None, until=None, limit=1000):
+        """
+        Observations matching the filters, newest first
+
+        Args:
+            item_id: Only this eBay item
+            category: Only this scan category / source
+            since, until: Time range (epoch seconds, datetime or ISO string)
+            limit: Maximum rows to return
+        """
+        clauses, params = [], []
+        if item_id:
+            clauses.append('o.item_id = ?')
+            params.append(item_id)
+        if category:
+            clauses.append('o.category = ?')
+            params.append(category)
+        if since is not None:
+            clauses.append('o.observed_at >= ?')
+            params.append(_to_timestamp(since))
+        if until is not None:
+            clauses.append('o.observed_at < ?')
+            params.append(_to_timestamp(until))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self.db.conn().execute(
+            'SELECT o.item_id, o.observed_at, o.price, o.seller, o.query, o.category, l.title, l.url '
+            f'FROM observations o LEFT JOIN listings l ON l.item_id = o.item_id {where} '
+            'ORDER BY o.observed_at DESC LIMIT ?',
+            params + [limit]
+        ).fetchall()
+
+        return [{
+            'id': item_id,
+            'observed_at': datetime.fromtimestamp(observed_at).isoformat(),
+            'price': price,
+            'seller': seller,
+            'search_query': query,
+            'category': category,
+            'title': title,
+            'url': url
+        } for item_id, observed_at, price, seller, query, category, title, url in rows]
+
+    def price_history(self, item_id):
+        """
+        Distinct prices for one item over time, oldest first
+
+        Consecutive sightings at the same price collapse into one entry.
+        """
+        rows = self.db.conn().execute(
+            'SELECT observed_at, price FROM observations WHERE item_id = ? ORDER BY observed_at',
+            (item_id,)
+        ).fetchall()
+
+        history = []
+        for observed_at, price in rows:
+            if not history or history[-1]['price'] != price:
+                history.append({'observed_at': datetime.fromtimestamp(observed_at).isoformat(),
+                                'price': price})
+        return history
+
+    def latest(self, item_id):
+        """Latest known state of one item, or None if never seen"""
+        row = self.db.conn().execute(
+            'SELECT title, url, seller, first_seen, last_seen, last_price FROM listings '
+            'WHERE item_id = ?', (item_id,)
+        ).fetchone()
+        if not row:
+            return None
+        title, url, seller, first_seen, last_seen, last_price = row
+        return {
+            'id': item_id,
+            'title': title,
+            'url': url,
+            'seller': seller,
+            'first_seen': datetime.fromtimestamp(first_seen).isoformat(),
+            'last_seen': datetime.fromtimestamp(last_seen).isoformat(),
+            'price': last_price
+        }
+
+    def new_listing_rate(self, query, days=7):
+        """
+        New listings per hour a query found over the last `days`, or None
+        if it has no observations in that window
+
+        A listing counts once, in the hour-window of its first sighting by
+        this query. Scans that capped results per query undercount, so
+        this is a starting estimate for the poll scheduler.
+        """
+        now = time.time()
+        since = now - days * 86400
+        first_seen, items = self.db.conn().execute(
+            'SELECT MIN(first), COUNT(*) FROM (SELECT MIN(observed_at) AS first FROM observations '
+            'WHERE query = ? GROUP BY item_id HAVING first >= ?)',
+            (query, since)
+        ).fetchone()
+        if not items:
+            return None
+        return items / max((now - first_seen) / 3600, 1.0)
+
+    def scan_mark(self, query):
+        """
+        Incremental scan state for a query
+
+        Returns:
+            Tuple of (high_water, seen). high_water is the newest
+            itemCreationDate processed ('' if never scanned); seen maps
+            recently processed item ids to the price they had, oldest
+            listing first.
+        """
+        row = self.db.conn().execute(
+            'SELECT high_water, seen FROM scan_marks WHERE query = ?', (query,)
+        ).fetchone()
+        if not row:
+            return '', {}
+        return row[0] or '', json.loads(row[1])
+
+    def save_scan_mark(self, query, high_water, seen):
+        """
+        Store a query's high-water mark, keeping the newest SEEN_IDS_PER_QUERY
+        ids (the last ones in seen, which is ordered oldest first)
+        """
+        if len(seen) > SEEN_IDS_PER_QUERY:
+            seen = dict(list(seen.items())[-SEEN_IDS_PER_QUERY:])
+        with self.db.transaction() as conn:
+            conn.execute(
+                'INSERT INTO scan_marks (query, high_water, seen, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(query) DO UPDATE SET high_water = excluded.high_water, '
+                'seen = excluded.seen, updated_at = excluded.updated_at',
+                (query, high_water, json.dumps(seen), time.time())
+            )
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_listing_history():
+    """Return the process-wide listing history store"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = ListingHistory()
+        return _history
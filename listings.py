@@ -0,0 +1,291 @@
+"""
+DATARADAR - Compact Listings
+Memory-lean forms of the deal dicts built from Browse API results: a
+slotted Listing for single records and a column-per-field ListingBatch
+for large sets, both converting back to the exact same dicts
+"""
+
+import sys
+from array import array
+
+# Core deal fields built by summarize_item (app) and summarize_listing (scanner)
+FIELDS = ('id', 'title', 'price', 'image', 'url', 'condition', 'seller',
+          'buying_option', 'location', 'listed_date')
+
+# Low-cardinality string fields stored once per distinct value
+INTERNED_FIELDS = frozenset(('condition', 'seller', 'buying_option', 'location',
+                             'search_query', 'source', 'category', 'grade', 'change'))
+
+_MISSING = object()
+
+
+def intern_fields(deal):
+    """Share one string object per distinct seller, condition, etc. across deal dicts"""
+    for key in INTERNED_FIELDS:
+        value = deal.get(key)
+        if type(value) is str:
+            deal[key] = sys.intern(value)
+    return deal
+
+
+class Listing:
+    """
+    One deal with its core fields in slots and anything else (search_query,
+    grade, matched_targets, ...) in a small dict
+
+    Supports the dict operations the pipeline uses (item access, get,
+    setdefault, in, keys, items), so it can stand in for a deal dict;
+    to_dict() gives the plain dict back with the original key order for
+    the core fields.
+    """
+
+    __slots__ = FIELDS + ('extra',)
+
+    def __init__(self, **fields):
+        for name in FIELDS:
+            setattr(self, name, _MISSING)
+        self.extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, deal):
+        return cls(**intern_fields(dict(deal)))
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def keys(self):
+        return [name for name in FIELDS if getattr(self, name) is not _MISSING] + list(self.extra or ())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f'Listing({self.to_dict()!r})'
+
+    def __eq__(self, other):
+        if isinstance(other, Listing):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+# =============================================================================
+# Columnar Batch
+# =============================================================================
+
+
+class _TextColumn:
+    """Unique strings (titles, urls, ids) packed as UTF-8 in one buffer"""
+
+    def __init__(self):
+        self.heap = bytearray()
+        self.ends = array('Q')
+
+    def accepts(self, value):
+        return type(value) is str
+
+    def append(self, value):
+        self.heap += value.encode('utf-8')
+        self.ends.append(len(self.heap))
+
+    def get(self, i):
+        start = self.ends[i - 1] if i else 0
+        return self.heap[start:self.ends[i]].decode('utf-8')
+
+    def __len__(self):
+        return len(self.ends)
+
+
+class _FloatColumn:
+    """Prices and other floats as raw doubles"""
+
+    def __init__(self):
+        self.values = array('d')
+
+    def accepts(self, value):
+        return type(value) is float
+
+    def append(self, value):
+        self.values.append(value)
+
+    def get(self, i):
+        return self.values[i]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class _InternColumn:
+    """Repeated strings (sellers, conditions, queries) as codes into a value table"""
+
+    def __init__(self):
+        self.codes = array('I')
+        self.strings = []
+        self._index = {}
+
+    def accepts(self, value):
+        return type(value) is str
+
+    def append(self, value):
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.strings)
+            self.strings.append(sys.intern(value))
+        self.codes.append(code)
+
+    def get(self, i):
+        return self.strings[self.codes[i]]
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class _ObjectColumn:
+    """Fallback for anything else, including keys some rows lack"""
+
+    def __init__(self, values=None):
+        self.values = values or []
+
+    def accepts(self, value):
+        return True
+
+    def append(self, value):
+        self.values.append(value)
+
+    def get(self, i):
+        return self.values[i]
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _new_column(key, value):
+    if type(value) is float:
+        return _FloatColumn()
+    if type(value) is str:
+        return _InternColumn() if key in INTERNED_FIELDS else _TextColumn()
+    return _ObjectColumn()
+
+
+class ListingBatch:
+    """
+    Append-only set of deals stored one column per key
+
+    A key seen in every row with a consistent type gets a packed column
+    (UTF-8 text buffer, float array or interned codes). Otherwise it falls
+    back to a plain list that also records which rows lack the key, so
+    every row converts back to exactly the dict it was built from.
+    """
+
+    def __init__(self, deals=()):
+        self._columns = {}   # key -> column, in first-seen key order
+        self._length = 0
+        self.extend(deals)
+
+    @classmethod
+    def from_dicts(cls, deals):
+        """Batch from a list of deal dicts (None stays None, for cache fetches)"""
+        return None if deals is None else cls(deals)
+
+    def append(self, deal):
+        n = self._length
+        for key, value in deal.items():
+            column = self._columns.get(key)
+            if column is None:
+                column = _new_column(key, value) if n == 0 else _ObjectColumn([_MISSING] * n)
+                self._columns[key] = column
+            elif not column.accepts(value):
+                column = self._columns[key] = self._demote(column)
+            column.append(value)
+
+        # Keys this row lacks
+        for key, column in self._columns.items():
+            if len(column) == n:
+                if not isinstance(column, _ObjectColumn):
+                    column = self._columns[key] = self._demote(column)
+                column.append(_MISSING)
+        self._length = n + 1
+
+    def extend(self, deals):
+        for deal in deals:
+            self.append(deal)
+
+    def _demote(self, column):
+        return _ObjectColumn([column.get(i) for i in range(len(column))])
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def row(self, i):
+        """Row i as a new deal dict"""
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError(i)
+        deal = {}
+        for key, column in self._columns.items():
+            value = column.get(i)
+            if value is not _MISSING:
+                deal[key] = value
+        return deal
+
+    def __getitem__(self, i):
+        return self.row(i)
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self.row(i)
+
+    def to_dicts(self):
+        """Every row as a fresh dict, safe for callers to mutate"""
+        return list(self)
+
+    def column(self, key):
+        """All values of one key (None where a row lacks it), without building rows"""
+        column = self._columns.get(key)
+        if column is None:
+            return [None] * self._length
+        if isinstance(column, _FloatColumn):
+            return column.values.tolist()
+        values = [column.get(i) for i in range(self._length)]
+        return [None if v is _MISSING else v for v in values]
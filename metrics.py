@@ -0,0 +1,328 @@
+"""
+DATARADAR - Metrics
+Counters, gauges and histograms rendered in the Prometheus text format,
+cheap enough to leave on in production (one lock and a dict update each)
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+
+# Latency buckets in seconds, from a cache hit to a slow eBay retry
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The scanner runs as its own process; it leaves its last-run gauges here
+# and /metrics in the app appends them
+SCANNER_METRICS_FILE = BASE_DIR / 'scanner_metrics.prom'
+
+# How often each server worker writes its snapshot to the multiprocess
+# directory, which bounds how stale another worker's view of it can be
+MULTIPROCESS_FLUSH_INTERVAL = 5.0
+
+_registry = []
+
+# Directory of per-process snapshots (see use_multiprocess_dir); None keeps
+# /metrics to this process's own values
+_multiprocess_dir = None
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=(), register=True):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if register:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def render(self, values=None):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def dump(self):
+        """Current values as a JSON-ready list of [label values, value]"""
+        with self._lock:
+            return json.loads(json.dumps([[list(k), v] for k, v in self._values.items()]))
+
+    def combine(self, current, value):
+        """Merge another process's value for a series into this one's"""
+        return current + value
+
+    def _render_series(self, key, value):
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. eBay calls by endpoint and status"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. the last scan's duration"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def combine(self, current, value):
+        # Snapshots are merged oldest first, so the latest write wins
+        return value
+
+
+class Histogram(_Metric):
+    """Latency distribution with cumulative buckets, _sum and _count"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS, register=True):
+        super().__init__(name, help_text, labels, register)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def combine(self, current, value):
+        return [[a + b for a, b in zip(current[0], value[0])],
+                current[1] + value[1], current[2] + value[2]]
+
+    def _render_series(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}')
+        inf = 'le="+Inf"'
+        lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, inf)} {count}')
+        lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}')
+        lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {count}')
+        return lines
+
+
+def render(metrics=None):
+    """
+    Prometheus text exposition of the given metrics (default: all registered)
+
+    With a multiprocess directory in use, the registered metrics are summed
+    over every server worker: this process's live values plus the other
+    workers' latest snapshots.
+    """
+    if metrics is None and _multiprocess_dir:
+        return _render_multiprocess()
+    lines = []
+    for metric in metrics if metrics is not None else _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# =============================================================================
+# Multiprocess Aggregation
+# =============================================================================
+
+def _snapshot_path(pid=None):
+    return Path(_multiprocess_dir) / f'{pid or os.getpid()}.json'
+
+
+def flush():
+    """Write this process's registered metrics to the multiprocess directory"""
+    if not _multiprocess_dir:
+        return
+    path = _snapshot_path()
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({metric.name: metric.dump() for metric in _registry}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Metrics flush error: {e}")
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def _read_snapshots():
+    """Other processes' snapshots, oldest first"""
+    own = _snapshot_path().name
+    paths = []
+    for path in Path(_multiprocess_dir).glob('*.json'):
+        try:
+            if path.name != own:
+                paths.append((path.stat().st_mtime, path))
+        except OSError:
+            continue    # Replaced while listing
+    snapshots = []
+    for _, path in sorted(paths):
+        try:
+            with open(path, 'r') as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Metrics snapshot error: {e}")
+    return snapshots
+
+
+def _render_multiprocess():
+    snapshots = _read_snapshots()
+    lines = []
+    for metric in _registry:
+        values = {}
+        for snapshot in snapshots:
+            for key, value in snapshot.get(metric.name, []):
+                key = tuple(key)
+                values[key] = metric.combine(values[key], value) if key in values else value
+        for key, value in metric.dump():
+            key = tuple(key)
+            values[key] = metric.combine(values[key], value) if key in values else value
+        lines.extend(metric.render(values))
+    return '\n'.join(lines) + '\n'
+
+
+def use_multiprocess_dir(path, interval=MULTIPROCESS_FLUSH_INTERVAL):
+    """
+    Aggregate /metrics over every process sharing path
+
+    Each process writes a snapshot of its registered metrics there every
+    interval seconds (and at exit); render() sums counters and histograms
+    over them. Snapshots of workers that have exited are kept, so counters
+    never go backwards; clear_multiprocess_dir() drops them at server start.
+    """
+    global _multiprocess_dir
+    os.makedirs(path, exist_ok=True)
+    _multiprocess_dir = str(path)
+    threading.Thread(target=_flush_loop, args=(interval,), daemon=True).start()
+    atexit.register(flush)
+
+
+def clear_multiprocess_dir(path):
+    """Remove snapshots left by an earlier server run"""
+    for snapshot in Path(path).glob('*.json'):
+        try:
+            snapshot.unlink()
+        except OSError as e:
+            print(f"Metrics cleanup error: {e}")
+
+
+def write_textfile(metrics, path=None):
+    """Atomically write metrics to a file (default: SCANNER_METRICS_FILE)"""
+    path = Path(path or SCANNER_METRICS_FILE)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(render(metrics))
+    os.replace(tmp_path, path)
+
+
+def read_textfile(path=None):
+    """Contents of a metrics textfile (default: SCANNER_METRICS_FILE), or '' if none"""
+    try:
+        with open(path or SCANNER_METRICS_FILE, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ''
+
+
+# =============================================================================
+# Application Metrics
+# =============================================================================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'dataradar_http_request_duration_seconds',
+    'Flask request latency by endpoint (streamed responses: until the first byte)',
+    ('endpoint', 'method', 'status')
+)
+
+EBAY_REQUESTS = Counter(
+    'dataradar_ebay_requests_total',
+    'eBay API requests (each retry attempt counts) by endpoint and status',
+    ('endpoint', 'status')
+)
+
+EBAY_REQUEST_SECONDS = Histogram(
+    'dataradar_ebay_request_duration_seconds',
+    'eBay API request latency by endpoint and status',
+    ('endpoint', 'status')
+)
+
+TOKEN_REFRESHES = Counter(
+    'dataradar_token_refreshes_total',
+    'eBay application token fetches by result',
+    ('result',)
+)
+
+WATCHLIST_OPERATIONS = Counter(
+    'dataradar_watchlist_operations_total',
+    'Watchlist store writes by operation and result',
+    ('operation', 'result')
+)
+
+# Scanner gauges live in their own (unregistered) set, written to
+# SCANNER_METRICS_FILE at the end of each run
+SCAN_DURATION = Gauge('dataradar_scan_duration_seconds',
+                      'Wall time of the last daily scan', ('mode',), register=False)
+SCAN_LAST_RUN = Gauge('dataradar_scan_last_run_timestamp_seconds',
+                      'Unix time the last daily scan finished', ('mode',), register=False)
+SCAN_SEARCHES = Gauge('dataradar_scan_searches',
+                      'Searches run by the last daily scan', ('mode',), register=False)
+SCAN_DEALS = Gauge('dataradar_scan_deals',
+                   'Unique deals found by the last daily scan', ('mode',), register=False)
+SCANNER_METRICS = [SCAN_DURATION, SCAN_LAST_RUN, SCAN_SEARCHES, SCAN_DEALS]
@@ -0,0 +1,207 @@
+"""
+DATARADAR - Adaptive Poll Scheduler
+Learns how fast each query gets new listings and how often it comes back
+empty, and spaces its polls to match, within a global call budget
+"""
+
+import threading
+import time
+from pathlib import Path
+
+from db import SQLiteDB
+
+BASE_DIR = Path(__file__).parent
+
+WATCH_STATE_DB = BASE_DIR / 'watch_state.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_stats (
+    query TEXT PRIMARY KEY,
+    rate REAL NOT NULL,
+    empty_rate REAL NOT NULL,
+    cost REAL NOT NULL,
+    polls INTEGER NOT NULL DEFAULT 0,
+    empty_polls INTEGER NOT NULL DEFAULT 0,
+    new_total INTEGER NOT NULL DEFAULT 0,
+    last_polled REAL,
+    next_due REAL NOT NULL
+);
+"""
+
+# Poll a query about once per this many expected new listings
+TARGET_NEW_PER_POLL = 1.0
+
+# Bounds on the time between polls of one query (seconds)
+MIN_INTERVAL = 2 * 60
+MAX_INTERVAL = 24 * 60 * 60
+
+# Weight of the latest poll in the moving averages
+RATE_ALPHA = 0.3
+
+# New listings per hour assumed for a query with no history
+DEFAULT_RATE = 0.25
+
+# A query that is always empty is polled this many times less often
+EMPTY_BACKOFF = 4.0
+
+# eBay calls per hour the watch loop may spend across all queries
+WATCH_CALLS_PER_HOUR = 150
+
+
+class PollScheduler:
+    """
+    Per-query poll statistics and due times, persisted in SQLite
+
+    rate is a moving average of new listings per hour, empty_rate the
+    fraction of recent polls that found nothing new, and cost the eBay
+    calls a poll takes. A query's interval aims at TARGET_NEW_PER_POLL new
+    listings per poll, stretched for queries that keep coming back empty.
+    If the intervals together would spend more than calls_per_hour, every
+    interval is stretched by the same factor.
+    """
+
+    def __init__(self, db_path=WATCH_STATE_DB, calls_per_hour=WATCH_CALLS_PER_HOUR):
+        self.db = SQLiteDB(db_path, SCHEMA)
+        self.calls_per_hour = calls_per_hour
+        self.scale = 1.0
+
+    def ensure(self, queries, seed_rate=None):
+        """
+        Start tracking new queries
+
+        New queries are due one after another, spaced so that polling
+        them all fits calls_per_hour, instead of all at once: the first
+        one immediately, the rest in the order given.
+
+        Args:
+            queries: Query strings, highest priority first
+            seed_rate: Optional callable(query) -> new listings per hour
+                estimated from past scans, or None if unknown
+        """
+        known = {row[0] for row in self.db.conn().execute('SELECT query FROM query_stats')}
+        now = time.time()
+        spacing = 3600 / self.calls_per_hour if self.calls_per_hour > 0 else 0.0
+        rows = []
+        for query in queries:
+            if query in known:
+                continue
+            rate = seed_rate(query) if seed_rate else None
+            rows.append((query, DEFAULT_RATE if rate is None else rate, 0.0, 1.0,
+                         now + len(rows) * spacing))
+        if rows:
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO query_stats (query, rate, empty_rate, cost, next_due) '
+                    'VALUES (?, ?, ?, ?, ?)', rows
+                )
+        return len(rows)
+
+    def interval(self, rate, empty_rate):
+        """Seconds between polls for a query's learned rates, before budget scaling"""
+        seconds = TARGET_NEW_PER_POLL / max(rate, 1e-6) * 3600
+        seconds *= 1 + (EMPTY_BACKOFF - 1) * empty_rate
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, seconds))
+
+    def rebalance(self, queries):
+        """
+        Recompute the budget scale for the active queries
+
+        Returns:
+            The scale (1.0 when the natural intervals fit the budget)
+        """
+        demand = 0.0
+        for rate, empty_rate, cost in self._rows(queries, 'rate, empty_rate, cost'):
+            demand += cost * 3600 / self.interval(rate, empty_rate)
+        self.scale = max(1.0, demand / self.calls_per_hour) if self.calls_per_hour > 0 else 1.0
+        return self.scale
+
+    def record_poll(self, query, new_count, calls, polled_at=None):
+        """
+        Fold one poll's outcome into the query's averages and schedule the next
+
+        The first poll of a query only sets its baseline: with no previous
+        poll there is no interval to measure a rate over.
+
+        Returns:
+            Seconds until the query is due again
+        """
+        polled_at = polled_at or time.time()
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                'SELECT rate, empty_rate, cost, last_polled FROM query_stats WHERE query = ?', (query,)
+            ).fetchone()
+            rate, empty_rate, cost, last_polled = row or (DEFAULT_RATE, 0.0, 1.0, None)
+
+            if last_polled:
+                hours = max(polled_at - last_polled, 1.0) / 3600
+                rate += RATE_ALPHA * (new_count / hours - rate)
+                empty_rate += RATE_ALPHA * ((0.0 if new_count else 1.0) - empty_rate)
+            cost += RATE_ALPHA * (max(calls, 1) - cost)
+
+            wait = self.interval(rate, empty_rate) * self.scale
+            conn.execute(
+                'INSERT INTO query_stats (query, rate, empty_rate, cost, polls, empty_polls, new_total, '
+                'last_polled, next_due) VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?) '
+                'ON CONFLICT(query) DO UPDATE SET rate = excluded.rate, empty_rate = excluded.empty_rate, '
+                'cost = excluded.cost, polls = polls + 1, empty_polls = empty_polls + excluded.empty_polls, '
+                'new_total = new_total + excluded.new_total, last_polled = excluded.last_polled, '
+                'next_due = excluded.next_due',
+                (query, rate, empty_rate, cost, 0 if new_count else 1, new_count,
+                 polled_at, polled_at + wait)
+            )
+        return wait
+
+    def postpone(self, query, seconds):
+        """Push a query's next poll back without counting a poll (e.g. quota denied)"""
+        self.db.conn().execute('UPDATE query_stats SET next_due = ? WHERE query = ?',
+                               (time.time() + seconds, query))
+
+    def due(self, queries, now=None):
+        """Queries due for a poll, most overdue first"""
+        now = now or time.time()
+        wanted = set(queries)
+        rows = self.db.conn().execute(
+            'SELECT query FROM query_stats WHERE next_due <= ? ORDER BY next_due', (now,)
+        ).fetchall()
+        return [query for (query,) in rows if query in wanted]
+
+    def seconds_until_due(self, queries, now=None):
+        """Seconds until the next of these queries is due (None if none are tracked)"""
+        now = now or time.time()
+        times = [next_due for (next_due,) in self._rows(queries, 'next_due')]
+        if not times:
+            return None
+        return max(0.0, min(times) - now)
+
+    def stats(self, queries):
+        """Learned statistics per query, fastest first"""
+        rows = self._rows(queries, 'query, rate, empty_rate, cost, polls, new_total, next_due')
+        result = [{
+            'query': query,
+            'new_per_hour': round(rate, 3),
+            'empty_rate': round(empty_rate, 3),
+            'calls_per_poll': round(cost, 2),
+            'interval_seconds': round(self.interval(rate, empty_rate) * self.scale),
+            'polls': polls,
+            'new_total': new_total,
+            'next_due': next_due
+        } for query, rate, empty_rate, cost, polls, new_total, next_due in rows]
+        return sorted(result, key=lambda s: -s['new_per_hour'])
+
+    def _rows(self, queries, columns):
+        wanted = set(queries)
+        rows = self.db.conn().execute(f'SELECT query, {columns} FROM query_stats').fetchall()
+        return [row[1:] for row in rows if row[0] in wanted]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_poll_scheduler():
+    """Return the process-wide poll scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PollScheduler()
+        return _scheduler
@@ -0,0 +1,95 @@
+"""
+DATARADAR - Query Consolidation Planner
+Compiles deal targets into fewer, broader eBay searches and routes the
+returned listings back to each original target by keyword and price
+"""
+
+from target_matcher import TargetMatcher, tokenize
+
+# Words too common to anchor a broader search on their own
+GENERIC_TOKENS = {
+    'signed', 'print', 'photo', 'autograph', 'autographed', 'coa', 'jsa', 'psa', 'bas',
+    'framed', 'limited', 'edition', 'original', 'authenticated', 'guitar', 'figure',
+}
+
+
+def plan_searches(targets):
+    """
+    Group targets into consolidated upstream searches
+
+    Targets in the same category are merged when they share at least one
+    distinctive (non-generic) keyword. A merged search uses the keywords
+    every member has in common, and its price range covers the union of
+    the members' ranges. Because cheap listings for one member can fill
+    the first pages, callers should page until every member has its deals
+    (see route_deals). Targets that don't merge keep their own query.
+
+    Args:
+        targets: Deal target dicts (query, min_price, max_price, category)
+
+    Returns:
+        List of plan dicts: query, min_price, max_price, category and the
+        member targets in their original order
+    """
+    plans = []
+    for target in targets:
+        tokens = set(tokenize(target['query']))
+        for plan in plans:
+            if plan['category'] != target['category']:
+                continue
+            common = plan['tokens'] & tokens
+            if common - GENERIC_TOKENS:
+                plan['tokens'] = common
+                plan['targets'].append(target)
+                plan['min_price'] = min(plan['min_price'], target.get('min_price', 0))
+                plan['max_price'] = max(plan['max_price'], target.get('max_price', 500))
+                break
+        else:
+            plans.append({
+                'tokens': tokens,
+                'category': target['category'],
+                'min_price': target.get('min_price', 0),
+                'max_price': target.get('max_price', 500),
+                'targets': [target],
+            })
+
+    for plan in plans:
+        if len(plan['targets']) == 1:
+            plan['query'] = plan['targets'][0]['query']
+        else:
+            # Keep the first member's word order for the shared keywords
+            words = plan['targets'][0]['query'].split()
+            plan['query'] = ' '.join(w for w in words if set(tokenize(w)) & plan['tokens'])
+        del plan['tokens']
+    return plans
+
+
+def route_deals(deals, targets, limit=3):
+    """
+    Route a consolidated search's deals back to each target
+
+    Stops reading deals as soon as every target has `limit` of them, so
+    deals can be a lazy iterator over result pages.
+
+    Args:
+        deals: Deals from the broad search, in the order eBay ranked them
+        targets: The plan's member targets
+        limit: Maximum deals per target
+
+    Returns:
+        Dict of target query -> list of matching deals (copies, so a
+        listing routed to two targets can be tagged for each)
+    """
+    matcher = TargetMatcher(targets)
+    routed = {target['query']: [] for target in targets}
+    open_targets = len(routed)
+    for deal in deals:
+        for target in matcher.match(deal.get('title'), deal['price']):
+            bucket = routed[target['query']]
+            if len(bucket) < limit:
+                bucket.append(dict(deal))
+                if len(bucket) == limit:
+                    open_targets -= 1
+        if not open_targets:
+            break
+    return routed
@@ -0,0 +1,222 @@
+"""
+DATARADAR - eBay Call Quota Budget
+Tracks Browse API calls over a rolling window and decides which searches
+can still be spent as the daily quota runs low
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from scoring import CATEGORY_PRICING
+
+try:
+    import fcntl
+except ImportError:  # Windows - no cross-process locking
+    fcntl = None
+
+BASE_DIR = Path(__file__).parent
+
+# eBay's default Browse API allowance is 5,000 calls per day
+QUOTA_LIMIT = 5000
+QUOTA_WINDOW = 24 * 60 * 60
+QUOTA_STATE_FILE = BASE_DIR / 'quota_state.json'
+
+# Write local call counts to disk after this many calls or seconds
+QUOTA_FLUSH_CALLS = 10
+QUOTA_FLUSH_SECONDS = 5
+
+# =============================================================================
+# Priorities
+# =============================================================================
+
+PRIORITY_WATCHLIST = 0    # Items the user is actively tracking
+PRIORITY_HIGH = 1         # User searches and high-margin categories
+PRIORITY_NORMAL = 2       # Everything else in DEAL_TARGETS
+PRIORITY_LOW = 3          # Speculative / background work
+
+# Fraction of the quota that must remain before a priority may spend a call
+PRIORITY_RESERVE = {
+    PRIORITY_WATCHLIST: 0.0,
+    PRIORITY_HIGH: 0.10,
+    PRIORITY_NORMAL: 0.25,
+    PRIORITY_LOW: 0.40,
+}
+
+# Expected resale margin by category: market value / buy-under price - 1
+CATEGORY_MARGINS = {
+    category: market / buy_under - 1
+    for category, (buy_under, market) in CATEGORY_PRICING.items()
+}
+
+# Categories at or above this margin are scheduled as PRIORITY_HIGH
+HIGH_MARGIN = 1.25
+
+
+def category_priority(category):
+    """Priority for a DEAL_TARGETS / default target category"""
+    if CATEGORY_MARGINS.get(category, 0) >= HIGH_MARGIN:
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+def prioritize(searches):
+    """
+    Order searches for scheduling: watchlist first, then by category margin
+
+    Each search dict needs a 'source' key ('watchlist' or a category name).
+    Sets search['priority'] and returns a new, stably sorted list.
+    """
+    for search in searches:
+        if search.get('source') == 'watchlist':
+            search['priority'] = PRIORITY_WATCHLIST
+        else:
+            search['priority'] = category_priority(search.get('source'))
+
+    return sorted(searches, key=lambda s: (
+        s['priority'],
+        -CATEGORY_MARGINS.get(s.get('source'), 0)
+    ))
+
+# =============================================================================
+# Quota Budget
+# =============================================================================
+
+
+class QuotaBudget:
+    """
+    Rolling-window call counter persisted across restarts
+
+    Calls are counted in one-minute buckets. Each process keeps unsaved
+    calls locally and periodically merges them into the shared state file
+    under a file lock, so the app and the scanner draw from one budget.
+    """
+
+    def __init__(self, limit=QUOTA_LIMIT, window=QUOTA_WINDOW, state_file=QUOTA_STATE_FILE):
+        self.limit = limit
+        self.window = window
+        self.state_file = Path(state_file)
+
+        self._lock = threading.Lock()
+        self._buckets = {}   # minute -> calls, as of the last flush
+        self._pending = {}   # minute -> calls not yet written to disk
+        self._last_flush = 0.0
+        self._denied = 0
+        self.flush()
+
+    def try_acquire(self, priority=PRIORITY_NORMAL, calls=1):
+        """Spend calls from the budget if this priority's reserve allows it"""
+        reserve = self.limit * PRIORITY_RESERVE.get(priority, 0.0)
+        with self._lock:
+            if self._remaining() - calls < reserve:
+                self._denied += 1
+                return False
+            minute = int(time.time() // 60)
+            self._pending[minute] = self._pending.get(minute, 0) + calls
+            self._buckets[minute] = self._buckets.get(minute, 0) + calls
+            should_flush = (sum(self._pending.values()) >= QUOTA_FLUSH_CALLS or
+                            time.monotonic() - self._last_flush >= QUOTA_FLUSH_SECONDS)
+        if should_flush:
+            self.flush()
+        return True
+
+    def page_charger(self, priority=PRIORITY_NORMAL, prepaid=0):
+        """
+        before_page callback for paginated searches
+
+        Charges one call per page, skipping the first `prepaid` pages that
+        the caller already acquired. Returns False once the budget says no.
+        """
+        pages = [0]
+
+        def charge():
+            pages[0] += 1
+            if pages[0] <= prepaid:
+                return True
+            return self.try_acquire(priority)
+
+        return charge
+
+    def remaining(self):
+        with self._lock:
+            return self._remaining()
+
+    def _remaining(self):
+        cutoff = int((time.time() - self.window) // 60)
+        used = sum(n for minute, n in self._buckets.items() if minute > cutoff)
+        return self.limit - used
+
+    def flush(self):
+        """Merge pending calls into the state file and reload everyone else's"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        try:
+            with open(self._lock_path(), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                buckets = self._read_state()
+                for minute, n in pending.items():
+                    buckets[minute] = buckets.get(minute, 0) + n
+
+                cutoff = int((time.time() - self.window) // 60)
+                buckets = {m: n for m, n in buckets.items() if m > cutoff}
+                self._write_state(buckets)
+        except OSError as e:
+            print(f"Quota state error: {e}")
+            with self._lock:
+                for minute, n in pending.items():
+                    self._pending[minute] = self._pending.get(minute, 0) + n
+            return
+
+        with self._lock:
+            # Calls recorded since we swapped out pending are not in the file yet
+            for minute, n in self._pending.items():
+                buckets[minute] = buckets.get(minute, 0) + n
+            self._buckets = buckets
+
+    def stats(self):
+        with self._lock:
+            remaining = self._remaining()
+            denied = self._denied
+        return {
+            'limit': self.limit,
+            'window_seconds': self.window,
+            'used': self.limit - remaining,
+            'remaining': remaining,
+            'denied': denied,
+        }
+
+    def _lock_path(self):
+        return str(self.state_file) + '.lock'
+
+    def _read_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return {int(m): n for m, n in json.load(f).get('buckets', {}).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, buckets):
+        tmp_path = str(self.state_file) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'buckets': {str(m): n for m, n in buckets.items()}}, f)
+        os.replace(tmp_path, self.state_file)
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_quota_budget():
+    """Return the process-wide quota budget"""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = QuotaBudget()
+            atexit.register(_budget.flush)
+        return _budget
@@ -0,0 +1,100 @@
+"""
+DATARADAR - Concurrent Scan Engine
+Runs the scanner's searches many at a time in a rolling thread pool,
+with a cap on searches in flight and a shared rate limit on eBay calls
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Searches in flight at once
+SCAN_CONCURRENCY = 64
+
+# eBay calls per second across the whole scan (burst up to one second's worth);
+# ebay_request still backs off on any 429 that gets through
+SCAN_RATE_LIMIT = 25
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: wait() blocks until the caller may make a call
+
+    Waits are reserved in arrival order, so a burst of callers is spread
+    evenly over time instead of all retrying at once.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+        return True
+
+
+def run_searches(searches, scan_one, on_result=None, concurrency=SCAN_CONCURRENCY, on_error=None):
+    """
+    Run scan_one(search) for every search, up to concurrency at a time
+
+    A rolling pool: the next search is taken as soon as one finishes, so a
+    slow search holds up only its own slot. searches may be a generator
+    (e.g. one that claims queued jobs); it is only advanced on the calling
+    thread, when a slot is free. scan_one is blocking (it pages eBay through
+    the shared keep-alive session), so each call runs in a worker thread.
+    on_result(search, result) runs on the calling thread as each search
+    finishes, so it can write to local stores without locking.
+
+    Args:
+        searches: Iterable of search dicts
+        scan_one: Callable(search) -> result
+        on_result: Optional callable(search, result), in completion order
+        concurrency: Maximum searches running at once
+        on_error: Optional callable(search, exception) for a search that
+            raised (on_result is not called for it)
+
+    Returns:
+        Results in the same order as searches (None for a search that raised)
+    """
+    concurrency = max(1, concurrency)
+    searches = iter(searches)
+    results = []
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='scan') as executor:
+        def fill():
+            while len(running) < concurrency:
+                search = next(searches, None)
+                if search is None:
+                    return
+                running[executor.submit(scan_one, search)] = (len(results), search)
+                results.append(None)
+
+        fill()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, search = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Scan error for {search.get('query')}: {e}")
+                    if on_error:
+                        on_error(search, e)
+                    continue
+                results[index] = result
+                if on_result:
+                    on_result(search, result)
+            fill()
+
+    return results
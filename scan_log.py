@@ -0,0 +1,223 @@
+"""
+DATARADAR - Scan Log
+Append-only log of every deal the scanner finds: one gzip-compressed
+NDJSON file per day, written in independently compressed blocks, with a
+SQLite index mapping dates, categories and item ids to block offsets so
+a reader decompresses only the blocks it needs
+"""
+
+import gzip
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from db import SQLiteDB
+
+try:
+    import fcntl
+except ImportError:  # Windows - no cross-process locking
+    fcntl = None
+
+BASE_DIR = Path(__file__).parent
+
+SCAN_LOG_DIR = BASE_DIR / 'scan_log'
+
+# Each block is a complete gzip member, so `zcat scan_log/*.ndjson.gz`
+# still reads the whole log
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    file TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    scan_date TEXT NOT NULL,
+    scan_id TEXT,
+    deals INTEGER NOT NULL,
+    written_at REAL NOT NULL,
+    PRIMARY KEY (file, offset)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    item_id TEXT,
+    category TEXT,
+    scan_date TEXT NOT NULL,
+    file TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_item ON entries (item_id);
+CREATE INDEX IF NOT EXISTS idx_entries_category ON entries (category, scan_date);
+CREATE INDEX IF NOT EXISTS idx_entries_date ON entries (scan_date);
+"""
+
+# Compression level for blocks: fast, still ~5x smaller than the JSON
+COMPRESS_LEVEL = 6
+
+
+def _categories(deal):
+    """Every category a deal is indexed under: where it was found plus what it matches"""
+    categories = [deal.get('source')] + list(deal.get('matched_categories') or [])
+    return list(dict.fromkeys(c for c in categories if c))
+
+
+class ScanLog:
+    """
+    Writer and indexed reader for the scan log
+
+    append() writes one block per call under an exclusive file lock, then
+    indexes it, so readers (the app, another process) only ever see
+    complete blocks. A block left unindexed by a crash is cut off by the
+    next append.
+    """
+
+    def __init__(self, log_dir=SCAN_LOG_DIR):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.db = SQLiteDB(self.log_dir / 'index.db', SCHEMA)
+
+    def _file_name(self, day):
+        return f"scan_log_{day.strftime('%Y%m%d')}.ndjson.gz"
+
+    def append(self, deals, scan_id=None, when=None):
+        """
+        Append deals as one compressed block and index them
+
+        Args:
+            deals: Deal dicts (tagged with source / matched_categories)
+            scan_id: Scan that found them (queued scan id, or 'watch')
+            when: Timestamp for the block (default: now)
+
+        Returns:
+            Number of deals written
+        """
+        if not deals:
+            return 0
+        when = when or datetime.now()
+        scan_date = when.strftime('%Y-%m-%d')
+        name = self._file_name(when)
+        lines = b''.join(json.dumps(dict(deal, scan_id=scan_id, logged_at=when.isoformat()),
+                                    separators=(',', ':')).encode('utf-8') + b'\n'
+                         for deal in deals)
+        block = gzip.compress(lines, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+        with open(self.log_dir / (name + '.lock'), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with open(self.log_dir / name, 'ab') as f:
+                # Drop any tail a crashed writer left unindexed
+                indexed_end = self._indexed_end(name)
+                if f.tell() > indexed_end:
+                    f.truncate(indexed_end)
+                offset = indexed_end
+                f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+
+            rows = [(deal.get('id'), category, scan_date, name, offset, line)
+                    for line, deal in enumerate(deals)
+                    for category in (_categories(deal) or [None])]
+            with self.db.transaction() as conn:
+                conn.execute(
+                    'INSERT INTO blocks (file, offset, length, scan_date, scan_id, deals, written_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (name, offset, len(block), scan_date, scan_id, len(deals), time.time())
+                )
+                conn.executemany(
+                    'INSERT INTO entries (item_id, category, scan_date, file, offset, line) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', rows
+                )
+        return len(deals)
+
+    def _indexed_end(self, name):
+        row = self.db.conn().execute(
+            'SELECT MAX(offset + length) FROM blocks WHERE file = ?', (name,)
+        ).fetchone()
+        return row[0] or 0
+
+    def dates(self):
+        """Logged dates, newest first, with deal and scan counts"""
+        rows = self.db.conn().execute(
+            'SELECT scan_date, SUM(deals), COUNT(DISTINCT scan_id), SUM(length) FROM blocks '
+            'GROUP BY scan_date ORDER BY scan_date DESC'
+        ).fetchall()
+        return [{'date': date, 'deals': deals, 'scans': scans, 'compressed_bytes': size}
+                for date, deals, scans, size in rows]
+
+    def query(self, date=None, category=None, item_id=None, scan_id=None, limit=100, offset=0):
+        """
+        Logged deals matching the filters, newest first
+
+        Only the blocks holding matching deals are decompressed, each read
+        from a memory map of its day file.
+
+        Args:
+            date: 'YYYY-MM-DD'
+            category: Source or matched category
+            item_id: eBay item id (every sighting, across days)
+            scan_id: Only deals from this scan
+            limit, offset: Page of results
+
+        Returns:
+            Dict with 'deals', 'total' matches and 'blocks_read'
+        """
+        clauses, params = [], []
+        if date:
+            clauses.append('e.scan_date = ?')
+            params.append(date)
+        if category:
+            clauses.append('e.category = ?')
+            params.append(category)
+        if item_id:
+            clauses.append('e.item_id = ?')
+            params.append(item_id)
+        if scan_id:
+            clauses.append('b.scan_id = ?')
+            params.append(scan_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        # One row per logged deal, even if it is indexed under several categories
+        base = (f'SELECT DISTINCT e.file, e.offset, e.line, b.length FROM entries e '
+                f'JOIN blocks b ON b.file = e.file AND b.offset = e.offset {where}')
+        conn = self.db.conn()
+        total = conn.execute(f'SELECT COUNT(*) FROM ({base})', params).fetchone()[0]
+        rows = conn.execute(
+            f'{base} ORDER BY e.file DESC, e.offset DESC, e.line LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+
+        deals = []
+        blocks = {}
+        maps = {}
+        try:
+            for name, block_offset, line, length in rows:
+                key = (name, block_offset)
+                if key not in blocks:
+                    if name not in maps:
+                        maps[name] = self._map(name)
+                    data = maps[name][block_offset:block_offset + length]
+                    blocks[key] = zlib.decompress(data, wbits=31).split(b'\n')
+                deals.append(json.loads(blocks[key][line]))
+        finally:
+            for mapped in maps.values():
+                mapped.close()
+        return {'deals': deals, 'total': total, 'blocks_read': len(blocks)}
+
+    def _map(self, name):
+        with open(self.log_dir / name, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_scan_log():
+    """Return the process-wide scan log"""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = ScanLog()
+        return _log
@@ -0,0 +1,343 @@
+"""
+DATARADAR - Scan Job Queue
+Durable SQLite queue that splits a daily scan into one job per search, so
+several scanner workers (processes or machines sharing the file) can
+claim, checkpoint and retry them, and a crashed scan resumes where it
+stopped
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from db import SQLiteDB
+
+BASE_DIR = Path(__file__).parent
+
+SCAN_QUEUE_DB = Path(os.environ.get('SCAN_QUEUE_DB', BASE_DIR / 'scan_queue.db'))
+
+# Set SCAN_QUEUE_WAL=0 when the queue file lives on a network share used by
+# several machines (WAL only works between processes on one host)
+SCAN_QUEUE_WAL = os.environ.get('SCAN_QUEUE_WAL', '1') != '0'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    settings TEXT NOT NULL,
+    searches INTEGER NOT NULL,
+    shards INTEGER NOT NULL,
+    merged_at REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    scan_id TEXT NOT NULL,
+    job_id INTEGER NOT NULL,
+    shard INTEGER NOT NULL,
+    search TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (scan_id, job_id)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (scan_id, status, shard, available_at);
+"""
+
+# Job states: pending -> running -> done | deferred (quota) | failed (out of attempts)
+PENDING, RUNNING, DONE, DEFERRED, FAILED = 'pending', 'running', 'done', 'deferred', 'failed'
+FINISHED = (DONE, DEFERRED, FAILED)
+
+# A running job whose worker stops checkpointing for this long is claimable again
+JOB_LEASE_SECONDS = 120
+
+# Attempts per job before it is marked failed, and the delay before a retry
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 30
+
+# Shards per scan; a worker can be pinned to some of them to spread
+# claims across machines
+DEFAULT_SHARDS = 16
+
+# Merged scans (their results are in the scan_results file and the scan
+# log by then) are deleted after this many seconds
+MERGED_SCAN_RETENTION = 7 * 24 * 60 * 60
+
+
+def worker_id():
+    """Identity recorded on claimed jobs: host, pid and a random suffix"""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+
+
+def shard_of(query, shards):
+    """Stable shard for a search query"""
+    return zlib.crc32(query.encode('utf-8')) % shards
+
+
+class ScanQueue:
+    """
+    Scans and their jobs, one job per search
+
+    A claimed job carries a lease that the worker renews at each
+    checkpoint. If the worker dies, the lease runs out and another worker
+    claims the job. Failed jobs go back to pending after JOB_RETRY_DELAY
+    until JOB_MAX_ATTEMPTS is reached.
+    """
+
+    def __init__(self, db_path=SCAN_QUEUE_DB, wal=SCAN_QUEUE_WAL):
+        self.db = SQLiteDB(db_path, SCHEMA, wal=wal)
+
+    def create_scan(self, searches, settings, shards=DEFAULT_SHARDS):
+        """
+        Enqueue a scan with one pending job per search
+
+        Args:
+            searches: Search dicts in priority order (job ids keep this order)
+            settings: JSON-serializable scan options (mode, per-query, ...)
+            shards: Number of shards jobs are spread over
+
+        Returns:
+            The new scan id
+        """
+        scan_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute(
+                'INSERT INTO scans (scan_id, created_at, settings, searches, shards) VALUES (?, ?, ?, ?, ?)',
+                (scan_id, now, json.dumps(settings), len(searches), shards)
+            )
+            conn.executemany(
+                'INSERT INTO jobs (scan_id, job_id, shard, search, status, available_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(scan_id, job_id, shard_of(search['query'], shards), json.dumps(search),
+                  PENDING, now, now) for job_id, search in enumerate(searches)]
+            )
+        return scan_id
+
+    def scan(self, scan_id):
+        """A scan's settings and job counts by status, or None"""
+        row = self.db.conn().execute(
+            'SELECT created_at, settings, searches, shards, merged_at FROM scans WHERE scan_id = ?',
+            (scan_id,)
+        ).fetchone()
+        if not row:
+            return None
+        created_at, settings, searches, shards, merged_at = row
+        counts = dict(self.db.conn().execute(
+            'SELECT status, COUNT(*) FROM jobs WHERE scan_id = ? GROUP BY status', (scan_id,)
+        ).fetchall())
+        return {
+            'scan_id': scan_id,
+            'created_at': datetime.fromtimestamp(created_at).isoformat(),
+            'settings': json.loads(settings),
+            'searches': searches,
+            'shards': shards,
+            'merged': merged_at is not None,
+            'jobs': counts,
+            'complete': sum(counts.get(s, 0) for s in FINISHED) == searches
+        }
+
+    def latest_open_scan(self, settings=None, max_age=None):
+        """Newest unmerged scan id (optionally with these settings and younger than max_age seconds)"""
+        clauses, params = ['merged_at IS NULL'], []
+        if settings is not None:
+            clauses.append('settings = ?')
+            params.append(json.dumps(settings))
+        if max_age is not None:
+            clauses.append('created_at >= ?')
+            params.append(time.time() - max_age)
+        row = self.db.conn().execute(
+            f"SELECT scan_id FROM scans WHERE {' AND '.join(clauses)} ORDER BY created_at DESC LIMIT 1",
+            params
+        ).fetchone()
+        return row[0] if row else None
+
+    def claim(self, scan_id, owner, limit=1, shards=None):
+        """
+        Claim up to limit runnable jobs, lowest job id (highest priority) first
+
+        Runnable means pending and due, or running with an expired lease.
+
+        Args:
+            scan_id: Scan to claim from
+            owner: Worker id (see worker_id())
+            limit: Maximum jobs to claim
+            shards: Optional collection of shard numbers this worker serves
+
+        Returns:
+            List of (job_id, search) tuples
+        """
+        now = time.time()
+        clauses = ['scan_id = ?',
+                   '((status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?))']
+        params = [scan_id, PENDING, now, RUNNING, now]
+        if shards is not None:
+            shards = list(shards)
+            clauses.append(f"shard IN ({','.join('?' * len(shards))})")
+            params.extend(shards)
+
+        with self.db.transaction() as conn:
+            rows = conn.execute(
+                f"SELECT job_id, search FROM jobs WHERE {' AND '.join(clauses)} ORDER BY job_id LIMIT ?",
+                params + [limit]
+            ).fetchall()
+            conn.executemany(
+                'UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, '
+                'started_at = ?, updated_at = ? WHERE scan_id = ? AND job_id = ?',
+                [(RUNNING, owner, now + JOB_LEASE_SECONDS, now, now, scan_id, job_id)
+                 for job_id, _ in rows]
+            )
+        return [(job_id, json.loads(search)) for job_id, search in rows]
+
+    def checkpoint(self, scan_id, job_id, owner):
+        """
+        Renew a running job's lease
+
+        Returns:
+            False if the job is no longer this worker's (its lease ran out
+            and someone else claimed it), so the caller should stop
+        """
+        now = time.time()
+        cursor = self.db.conn().execute(
+            'UPDATE jobs SET lease_expires = ?, updated_at = ? '
+            'WHERE scan_id = ? AND job_id = ? AND owner = ? AND status = ?',
+            (now + JOB_LEASE_SECONDS, now, scan_id, job_id, owner, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, scan_id, job_id, owner, result):
+        """Store a job's result (JSON-serializable); False if the job was lost to another worker"""
+        return self._finish(scan_id, job_id, owner, DONE, result=json.dumps(result))
+
+    def defer(self, scan_id, job_id, owner):
+        """Mark a job skipped for lack of quota"""
+        return self._finish(scan_id, job_id, owner, DEFERRED)
+
+    def fail(self, scan_id, job_id, owner, error):
+        """Record an error: back to pending after JOB_RETRY_DELAY, or failed once out of attempts"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                'SELECT attempts FROM jobs WHERE scan_id = ? AND job_id = ? AND owner = ? AND status = ?',
+                (scan_id, job_id, owner, RUNNING)
+            ).fetchone()
+            if not row:
+                return False
+            status = FAILED if row[0] >= JOB_MAX_ATTEMPTS else PENDING
+            conn.execute(
+                'UPDATE jobs SET status = ?, owner = NULL, lease_expires = NULL, available_at = ?, '
+                'error = ?, updated_at = ? WHERE scan_id = ? AND job_id = ?',
+                (status, now + JOB_RETRY_DELAY, str(error), now, scan_id, job_id)
+            )
+        return True
+
+    def _finish(self, scan_id, job_id, owner, status, result=None):
+        cursor = self.db.conn().execute(
+            'UPDATE jobs SET status = ?, result = ?, lease_expires = NULL, updated_at = ? '
+            'WHERE scan_id = ? AND job_id = ? AND owner = ? AND status = ?',
+            (status, result, time.time(), scan_id, job_id, owner, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def next_wakeup(self, scan_id, shards=None):
+        """
+        Seconds until a job of this scan may become claimable, or None if
+        every job is finished
+        """
+        clauses, params = ['scan_id = ?', 'status IN (?, ?)'], [scan_id, PENDING, RUNNING]
+        if shards is not None:
+            shards = list(shards)
+            clauses.append(f"shard IN ({','.join('?' * len(shards))})")
+            params.extend(shards)
+        row = self.db.conn().execute(
+            f"SELECT MIN(CASE WHEN status = '{PENDING}' THEN available_at ELSE lease_expires END) "
+            f"FROM jobs WHERE {' AND '.join(clauses)}",
+            params
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def results(self, scan_id):
+        """
+        Every job of a scan in job id (priority) order
+
+        Results are decoded one job at a time as the caller iterates, so
+        a large scan's deals need not all exist as dicts at once.
+
+        Yields:
+            (search, status, result) with result decoded (None unless done)
+        """
+        rows = self.db.conn().execute(
+            'SELECT search, status, result FROM jobs WHERE scan_id = ? ORDER BY job_id', (scan_id,)
+        ).fetchall()
+        for search, status, result in rows:
+            yield json.loads(search), status, json.loads(result) if result else None
+
+    def active_seconds(self, scan_id):
+        """
+        Seconds during which at least one of the scan's jobs was running
+
+        Gaps with nothing running (a crashed scan waiting to be resumed)
+        don't count; parallel workers count once.
+        """
+        rows = self.db.conn().execute(
+            'SELECT started_at, updated_at FROM jobs WHERE scan_id = ? AND status IN (?, ?, ?) '
+            'AND started_at IS NOT NULL ORDER BY started_at',
+            (scan_id,) + FINISHED
+        ).fetchall()
+        total = 0.0
+        span_start = span_end = None
+        for started, finished in rows:
+            if span_end is None or started > span_end:
+                if span_end is not None:
+                    total += span_end - span_start
+                span_start, span_end = started, finished
+            else:
+                span_end = max(span_end, finished)
+        if span_end is not None:
+            total += span_end - span_start
+        return total
+
+    def mark_merged(self, scan_id):
+        self.db.conn().execute('UPDATE scans SET merged_at = ? WHERE scan_id = ?',
+                               (time.time(), scan_id))
+
+    def prune(self, retention=MERGED_SCAN_RETENTION):
+        """
+        Delete scans merged more than retention seconds ago, with their jobs
+
+        Returns:
+            Number of scans deleted
+        """
+        cutoff = time.time() - retention
+        with self.db.transaction() as conn:
+            conn.execute(
+                'DELETE FROM jobs WHERE scan_id IN (SELECT scan_id FROM scans WHERE merged_at < ?)',
+                (cutoff,)
+            )
+            cursor = conn.execute('DELETE FROM scans WHERE merged_at < ?', (cutoff,))
+        return cursor.rowcount
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_scan_queue():
+    """Return the process-wide scan queue"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ScanQueue()
+        return _queue
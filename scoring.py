@@ -0,0 +1,122 @@
+"""
+DATARADAR - Deal Scoring
+Grades listings against market value using the STRATEGY.md scoring table
+"""
+
+import re
+
+# Buy-under price and typical sell price (market value) per category, from
+# the STRATEGY.md target category tables
+CATEGORY_PRICING = {
+    'KAWS': (400, 700),
+    'Shepard Fairey': (150, 325),
+    'Mr. Brainwash': (200, 425),
+    'Death NYC': (50, 100),
+    'Banksy': (500, 1000),
+    'Street Art': (150, 315),
+    'NASA': (250, 575),
+    'Space': (250, 575),
+    'Bearbrick': (500, 1150),
+    'Vinyl': (150, 400),
+    'Pickguard': (100, 300),
+    'Celebrity': (200, 500),
+}
+
+# Pricing Strategy: target buy price is 40-60% of market value, so a
+# target's max price implies a market value of at least max / 0.6
+BUY_RATIO = 0.6
+
+# Resale costs: eBay final value fees plus an average shipping cost
+EBAY_FEE_RATE = 0.13
+SHIPPING_COST = 15.0
+
+# Named authenticators count as a verified COA; a bare "COA" only counts as present
+_VERIFIED_RE = re.compile(r'\b(jsa|psa|bas|beckett)\b', re.IGNORECASE)
+_COA_RE = re.compile(r'\b(coa|authenticated|authentication|certificate)\b', re.IGNORECASE)
+
+
+def market_value(deal, category=None):
+    """Best available market value estimate for a deal, or None"""
+    if deal.get('market_value'):
+        return float(deal['market_value'])
+
+    pricing = CATEGORY_PRICING.get(category or deal.get('category') or deal.get('source'))
+    if pricing:
+        return float(pricing[1])
+
+    if deal.get('max_deal_price'):
+        return deal['max_deal_price'] / BUY_RATIO
+    return None
+
+
+def _grade(ratio, has_coa, verified, known_category):
+    """Deal Scoring System: A+ needs <40% of market, a named authenticator and a target category"""
+    if ratio is None:
+        return None
+    if ratio < 0.40 and verified and known_category:
+        return 'A+'
+    if ratio < 0.50 and has_coa:
+        return 'A'
+    if ratio < 0.60 and has_coa:
+        return 'B'
+    if ratio < 0.70:
+        return 'C'
+    return 'D'
+
+
+def score_deals(deals, category=None):
+    """
+    Score a batch of deals in one columnar pass and attach the results
+
+    Adds to each deal:
+        market_value: Estimated resale value
+        market_ratio: Price as a fraction of market value
+        est_profit: Resale value after fees and shipping, minus price
+        margin: est_profit / price
+        grade: 'A+' to 'D' per the STRATEGY.md table (None if no market value)
+        score: 0-100 ranking score (higher is better)
+
+    Args:
+        deals: List of deal dicts with 'price' and 'title'
+        category: Category for the whole batch (default: each deal's
+            'category' or 'source')
+
+    Returns:
+        The same list, for chaining
+    """
+    if not deals:
+        return deals
+
+    # Columns
+    prices = [d['price'] for d in deals]
+    titles = [d.get('title') or '' for d in deals]
+    cats = [category or d.get('category') or d.get('source') for d in deals]
+    markets = [market_value(d, c) for d, c in zip(deals, cats)]
+    verified = [bool(_VERIFIED_RE.search(t)) for t in titles]
+    has_coa = [v or bool(_COA_RE.search(t)) for v, t in zip(verified, titles)]
+
+    ratios = [p / m if m else None for p, m in zip(prices, markets)]
+    net_resale = [m * (1 - EBAY_FEE_RATE) - SHIPPING_COST if m else None for m in markets]
+    profits = [n - p if n is not None else None for n, p in zip(net_resale, prices)]
+
+    for i, deal in enumerate(deals):
+        ratio = ratios[i]
+        deal['market_value'] = round(markets[i], 2) if markets[i] else None
+        deal['market_ratio'] = round(ratio, 3) if ratio is not None else None
+        deal['est_profit'] = round(profits[i], 2) if profits[i] is not None else None
+        deal['margin'] = round(profits[i] / prices[i], 3) if profits[i] is not None and prices[i] else None
+        deal['grade'] = _grade(ratio, has_coa[i], verified[i], cats[i] in CATEGORY_PRICING)
+
+        if ratio is None:
+            deal['score'] = 0
+        else:
+            score = 100 * (1 - ratio) + (10 if has_coa[i] else 0) + (5 if verified[i] else 0)
+            deal['score'] = int(max(0, min(100, round(score))))
+
+    return deals
+
+
+def rank_deals(deals):
+    """Sort scored deals best first (score, then lowest price)"""
+    deals.sort(key=lambda d: (-d.get('score', 0), d['price']))
+    return deals
@@ -0,0 +1,194 @@
+"""
+DATARADAR - In-Process Search Result Cache
+Bounded TTL + LRU cache with stale-while-revalidate for eBay search results,
+optionally backed by a SharedCache so several workers share one set of results
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a worker waits for another worker's in-flight fetch of the same key
+SHARED_FETCH_WAIT = 10
+
+
+class SearchCache:
+    """
+    Thread-safe TTL + LRU cache
+
+    Entries are fresh for `ttl` seconds. After that, and for up to `grace`
+    more seconds, the stale value is returned immediately while a background
+    thread refreshes it. Anything older is refetched synchronously, falling
+    back to the expired value if that fetch fails. When the cache holds more
+    than `max_entries`, the least recently used entry is evicted.
+
+    With a `shared` SharedCache, an in-process miss first checks the shared
+    store, and only one worker at a time fetches a given key from eBay.
+    Shared values arrive as plain JSON; `pack` converts them to the form
+    fetch() returns (e.g. ListingBatch.from_dicts).
+    """
+
+    def __init__(self, max_entries=500, ttl=300, grace=600, shared=None, pack=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.grace = grace
+        self.shared = shared
+        self.pack = pack
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = set()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0,
+                       'evictions': 0, 'errors': 0, 'fallbacks': 0, 'shared_hits': 0}
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return the cached value for key, calling fetch() when needed
+
+        fetch() should return None on failure (or when the call is deferred);
+        failures are never cached.
+        """
+        with self._lock:
+            found, value = self._lookup(key, fetch)
+        if found:
+            return value
+
+        # Another worker may already have it
+        if self.shared is not None and self._adopt_shared(key):
+            with self._lock:
+                found, value = self._lookup(key, fetch)
+                if found:
+                    self._stats['shared_hits'] += 1
+            if found:
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        value = self._fetch(key, fetch)
+        if value is not None:
+            return value
+
+        # Fetch failed or was deferred - fall back to an expired entry if we still hold one
+        with self._lock:
+            self._stats['errors'] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._stats['fallbacks'] += 1
+                return entry[0]
+        return None
+
+    def _lookup(self, key, fetch):
+        """(found, value) from the in-process entries; call with the lock held"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age < self.ttl:
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, value
+        if age < self.ttl + self.grace:
+            self._entries.move_to_end(key)
+            self._stats['stale_hits'] += 1
+            if key not in self._refreshing:
+                self._refreshing.add(key)
+                threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+            return True, value
+        return False, None
+
+    def _fetch(self, key, fetch):
+        """fetch() and store the result; with a shared store, one worker per key at a time"""
+        if self.shared is None:
+            value = fetch()
+            if value is not None:
+                self._store(key, value)
+            return value
+
+        shared_key = self._shared_key(key)
+        if not self.shared.acquire_lease(f'fetch:{shared_key}', SHARED_FETCH_WAIT):
+            # Someone else is fetching this key - wait for their result
+            entry = self.shared.wait_for(shared_key, SHARED_FETCH_WAIT)
+            if entry is not None:
+                value = self._from_shared(entry[0])
+                self._store(key, value, age=max(0.0, time.time() - entry[1]), share=False)
+                return value
+        try:
+            value = fetch()
+            if value is not None:
+                self._store(key, value)
+            return value
+        finally:
+            self.shared.release_lease(f'fetch:{shared_key}')
+
+    def _refresh(self, key, fetch):
+        try:
+            if self.shared is not None:
+                # Adopt a fresh copy another worker stored, or leave the refresh to the lease holder
+                if self._adopt_shared(key, fresh_only=True):
+                    return
+                shared_key = self._shared_key(key)
+                if not self.shared.acquire_lease(f'fetch:{shared_key}', SHARED_FETCH_WAIT):
+                    return
+                try:
+                    value = fetch()
+                finally:
+                    self.shared.release_lease(f'fetch:{shared_key}')
+            else:
+                value = fetch()
+
+            with self._lock:
+                if value is not None:
+                    self._stats['refreshes'] += 1
+                else:
+                    self._stats['errors'] += 1
+            if value is not None:
+                self._store(key, value)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, age=0.0, share=True):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() - age)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        if share and self.shared is not None:
+            self.shared.set(self._shared_key(key), value, self.ttl + self.grace)
+
+    def _shared_key(self, key):
+        return 'search:' + json.dumps(key)
+
+    def _adopt_shared(self, key, fresh_only=False):
+        """Copy a usable shared entry into this process, keeping its age. Returns True if adopted."""
+        entry = self.shared.get(self._shared_key(key))
+        if entry is None:
+            return False
+        value, stored_at = entry
+        age = max(0.0, time.time() - stored_at)
+        if age >= (self.ttl if fresh_only else self.ttl + self.grace):
+            return False
+        self._store(key, self._from_shared(value), age=age, share=False)
+        return True
+
+    def _from_shared(self, value):
+        """A value read from the shared store, in the form fetch() returns"""
+        return self.pack(value) if self.pack is not None else value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters plus current size, for tuning TTL against eBay's quota"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 3) if lookups else 0.0
+        stats.update({'max_entries': self.max_entries, 'ttl': self.ttl, 'grace': self.grace,
+                      'shared': self.shared is not None})
+        return stats
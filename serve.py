@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+DATARADAR - Production Server
+Runs the Flask app under gunicorn with several worker processes, each
+with its own thread pool. Workers share search results, the eBay token
+and the comps snapshot through one SQLite cache (shared_cache.py), so
+adding workers adds throughput without multiplying eBay calls. Each
+worker also leaves metric snapshots in METRICS_DIR, so /metrics reports
+totals over all workers rather than those of whichever one answered.
+
+Usage:
+    python serve.py                         # 4 workers x 8 threads on :5051
+    python serve.py --workers 8 --threads 16 --port 8000
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+
+# Default location of the cache shared by all workers
+SHARED_CACHE_DB = BASE_DIR / 'shared_cache.db'
+
+# Default directory for the workers' metric snapshots
+METRICS_DIR = BASE_DIR / 'metrics_data'
+
+
+def load_app():
+    """Import the Flask app (in each worker, after SHARED_CACHE_DB is set)"""
+    from app import app
+    return app
+
+
+def serve(host='0.0.0.0', port=5051, workers=4, threads=8, timeout=60):
+    """
+    Serve the app with gunicorn's threaded workers
+
+    The app is loaded in each worker after the fork (no preload), so every
+    worker starts its own HTTP pool and background threads.
+    """
+    os.environ.setdefault('SHARED_CACHE_DB', str(SHARED_CACHE_DB))
+    os.environ.setdefault('METRICS_DIR', str(METRICS_DIR))
+
+    # Counters restart with the server; drop the last run's worker snapshots
+    import metrics
+    metrics.clear_multiprocess_dir(os.environ['METRICS_DIR'])
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # No gunicorn (e.g. on Windows): one process, threaded
+        print("gunicorn not installed - falling back to a single threaded process")
+        from werkzeug.serving import run_simple
+        run_simple(host, port, load_app(), threaded=True)
+        return
+
+    class DealRadarServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            # SSE streams and comps rebuilds can run for a while
+            self.cfg.set('timeout', timeout)
+            self.cfg.set('accesslog', '-')
+
+        def load(self):
+            return load_app()
+
+    print(f"DEAL Radar: {workers} workers x {threads} threads on {host}:{port}")
+    print(f"Shared cache: {os.environ['SHARED_CACHE_DB']}")
+    print(f"Metrics dir: {os.environ['METRICS_DIR']}")
+    DealRadarServer().run()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DEAL Radar production server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5051)
+    parser.add_argument('--workers', type=int, default=4, help='worker processes (default: 4)')
+    parser.add_argument('--threads', type=int, default=8, help='threads per worker (default: 8)')
+    parser.add_argument('--timeout', type=int, default=60, help='worker timeout in seconds (default: 60)')
+    args = parser.parse_args()
+
+    serve(host=args.host, port=args.port, workers=args.workers, threads=args.threads,
+          timeout=args.timeout)
@@ -0,0 +1,144 @@
+"""
+DATARADAR - Cross-Process Shared Cache
+SQLite key/value store with expiry and leases, so several server workers
+share search results, the eBay token and the comps snapshot instead of
+each fetching their own
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from db import SQLiteDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires_at);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Expired rows are deleted every this many writes
+PURGE_EVERY = 200
+
+
+def _encode(value):
+    """JSON fallback for compact containers (e.g. listings.ListingBatch)"""
+    if hasattr(value, 'to_dicts'):
+        return value.to_dicts()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _owner():
+    return f'{os.getpid()}:{threading.get_ident()}'
+
+
+class SharedCache:
+    """
+    Values (anything JSON-serializable) keyed by string, visible to every
+    process using the same database file
+
+    Leases give cross-process single-flight: the worker holding a lease
+    does the expensive fetch while the others wait for its result. A lease
+    expires on its own if its holder dies. Database errors are logged and
+    treated as a miss, so a broken cache never breaks a request.
+    """
+
+    def __init__(self, db_path):
+        self.db = SQLiteDB(db_path, SCHEMA)
+        self._writes = 0
+
+    def get(self, key):
+        """Return (value, stored_at) for a live entry, or None. stored_at is epoch seconds."""
+        try:
+            row = self.db.conn().execute(
+                'SELECT value, stored_at FROM cache WHERE key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Shared cache error: {e}")
+            return None
+        if not row:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl, stored_at=None):
+        """Store value for ttl seconds"""
+        stored_at = stored_at or time.time()
+        try:
+            self.db.conn().execute(
+                'INSERT OR REPLACE INTO cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value, default=_encode), stored_at, stored_at + ttl)
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self.purge()
+        except sqlite3.Error as e:
+            print(f"Shared cache error: {e}")
+
+    def delete(self, key):
+        try:
+            self.db.conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            print(f"Shared cache error: {e}")
+
+    def purge(self):
+        """Delete expired entries and leases"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+            conn.execute('DELETE FROM leases WHERE expires_at <= ?', (now,))
+
+    def acquire_lease(self, name, ttl):
+        """
+        Take the named lease for ttl seconds unless another live owner holds it
+
+        Returns:
+            True if this thread now holds the lease (also on database errors,
+            so callers fall back to doing the work themselves)
+        """
+        owner = _owner()
+        now = time.time()
+        try:
+            with self.db.transaction() as conn:
+                row = conn.execute('SELECT owner, expires_at FROM leases WHERE name = ?',
+                                   (name,)).fetchone()
+                if row and row[1] > now and row[0] != owner:
+                    return False
+                conn.execute('INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)',
+                             (name, owner, now + ttl))
+                return True
+        except sqlite3.Error as e:
+            print(f"Shared cache error: {e}")
+            return True
+
+    def release_lease(self, name):
+        try:
+            self.db.conn().execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, _owner()))
+        except sqlite3.Error as e:
+            print(f"Shared cache error: {e}")
+
+    def wait_for(self, key, timeout, newer_than=0.0, poll=0.05):
+        """
+        Poll until key holds an entry stored after newer_than, or timeout
+
+        Returns:
+            (value, stored_at) or None
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(poll)
+            entry = self.get(key)
+            if entry and entry[1] > newer_than:
+                return entry
+        return None
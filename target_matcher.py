@@ -0,0 +1,158 @@
+"""
+DATARADAR - Target Matcher
+Classifies listing titles into every deal target and category they satisfy,
+using one Aho-Corasick automaton over all target keywords and authenticator
+tokens, so each title is scanned once however many targets there are
+"""
+
+import re
+import threading
+from collections import deque
+
+from deal_targets import DEAL_TARGETS, get_default_targets
+
+# Authentication tokens reported for every listing, targets or not
+AUTHENTICATORS = ('coa', 'jsa', 'psa', 'bas', 'beckett')
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens ('1000%' -> '1000', 'Mr.' -> 'mr')"""
+    return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+
+def _pattern(token):
+    """
+    Automaton pattern for a keyword
+
+    Keywords match at the start of a title word, so "autograph" also finds
+    "autographed". Authenticators and numbers must match the whole word,
+    so "bas" never matches "bass" and "11" never matches "110".
+    """
+    if token in AUTHENTICATORS or token.isdigit():
+        return f' {token} '
+    return f' {token}'
+
+
+class TargetMatcher:
+    """
+    Compiled matcher for a list of deal targets
+
+    A listing matches a target when its title contains every keyword of the
+    target's query and, if a price is given, the price is inside the
+    target's min_price / max_price band.
+    """
+
+    def __init__(self, targets):
+        self.targets = list(targets)
+
+        # One bit per distinct keyword pattern; a target needs all of its bits
+        bits = {}
+        self._required = []
+        for target in self.targets:
+            mask = 0
+            for token in tokenize(target['query']):
+                mask |= bits.setdefault(_pattern(token), 1 << len(bits))
+            self._required.append(mask)
+        self._authenticators = [
+            (token, bits.setdefault(_pattern(token), 1 << len(bits))) for token in AUTHENTICATORS
+        ]
+
+        self._compile(bits)
+
+    def _compile(self, bits):
+        """Build the goto / fail / output tables"""
+        goto = [{}]
+        out = [0]
+        for pattern, bit in bits.items():
+            state = 0
+            for ch in pattern:
+                if ch not in goto[state]:
+                    goto.append({})
+                    out.append(0)
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            out[state] |= bit
+
+        # Breadth-first fail links; each state also emits its fail state's output
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                out[child] |= out[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def scan(self, title):
+        """Bitmask of every keyword pattern found in a title (one pass)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = 0
+        for ch in f" {' '.join(tokenize(title))} ":
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found |= out[state]
+        return found
+
+    def _matching(self, found, price):
+        return [
+            target for target, mask in zip(self.targets, self._required)
+            if found & mask == mask and (
+                price is None
+                or target.get('min_price', 0) <= price <= target.get('max_price', 500)
+            )
+        ]
+
+    def match(self, title, price=None):
+        """
+        Every target a listing satisfies
+
+        Args:
+            title: Listing title
+            price: Listing price, or None to match on keywords only
+
+        Returns:
+            List of matching target dicts, in target order
+        """
+        return self._matching(self.scan(title), price)
+
+    def classify(self, title, price=None):
+        """
+        Targets, categories and authenticators for one listing
+
+        Returns:
+            Dict with 'targets' (matching queries), 'categories' (their
+            categories, first match first) and 'authenticators' (e.g. ['jsa'])
+        """
+        found = self.scan(title)
+        targets = self._matching(found, price)
+        categories = []
+        for target in targets:
+            if target['category'] not in categories:
+                categories.append(target['category'])
+        return {
+            'targets': [target['query'] for target in targets],
+            'categories': categories,
+            'authenticators': [token for token, bit in self._authenticators if found & bit],
+        }
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_target_matcher():
+    """Return the process-wide matcher over DEAL_TARGETS and the scanner's default targets"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = TargetMatcher(DEAL_TARGETS + get_default_targets())
+        return _matcher
@@ -0,0 +1,72 @@
+"""
+DATARADAR - Consolidated Search Tests
+A merged comps search must still find deals for a target whose price band
+starts above the cheap listings of another member
+
+Run: python -m unittest test_comps_plan
+"""
+
+import os
+import tempfile
+import unittest
+
+from fake_ebay import FakeEbayServer
+
+KAWS_TARGETS = [
+    {'query': 'KAWS signed print', 'min_price': 200, 'max_price': 600, 'category': 'KAWS'},
+    {'query': 'KAWS companion figure', 'min_price': 150, 'max_price': 400, 'category': 'KAWS'},
+]
+
+
+def listing(n, title, price):
+    return {
+        'itemId': f'v1|{200000000000 + n}|0',
+        'title': title,
+        'price': {'value': f'{price:.2f}', 'currency': 'USD'},
+        'itemWebUrl': f'https://www.ebay.com/itm/{200000000000 + n}',
+        'seller': {'username': f'seller{n}'},
+        'condition': 'New',
+    }
+
+
+class CrowdedPlanTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 150 cheap companion figures fill the first 100 results by price
+        items = [listing(n, f'KAWS companion figure #{n}', 150 + n * 0.3) for n in range(150)]
+        items += [listing(1000 + n, f'KAWS signed print {n}', 300 + n * 50) for n in range(3)]
+        cls.fake = FakeEbayServer(items=items)
+        cls.fake.start()
+        cls.tmp = tempfile.TemporaryDirectory()
+
+        os.environ['EBAY_API_BASE'] = cls.fake.base_url
+        import app
+        from benchmark import isolate_state
+        isolate_state(cls.tmp.name)
+        cls.app = app
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake.stop()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.app.search_cache.clear()
+
+    def test_merged_search_matches_direct_search(self):
+        from query_planner import plan_searches
+
+        plans = plan_searches(KAWS_TARGETS)
+        self.assertEqual(len(plans), 1)
+        merged = self.app.search_plan(plans[0])
+
+        for target in KAWS_TARGETS:
+            direct = self.app.search_target(dict(target))
+            self.assertEqual([d['id'] for d in merged[target['query']]],
+                             [d['id'] for d in direct], target['query'])
+        self.assertEqual(len(merged['KAWS signed print']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
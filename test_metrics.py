@@ -0,0 +1,56 @@
+"""
+DATARADAR - Metrics Tests
+With a multiprocess directory, /metrics totals every server worker's
+counters and histograms, whichever worker renders it
+
+Run: python -m unittest test_metrics
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+import metrics
+
+
+class MultiprocessMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.counter = metrics.Counter('test_requests_total', 'Test requests', ('status',))
+        self.histogram = metrics.Histogram('test_seconds', 'Test latency', buckets=(0.1, 1.0))
+        metrics._multiprocess_dir = self.tmp.name
+
+    def tearDown(self):
+        metrics._multiprocess_dir = None
+        metrics._registry.remove(self.counter)
+        metrics._registry.remove(self.histogram)
+        self.tmp.cleanup()
+
+    def other_worker(self, pid, snapshot):
+        with open(os.path.join(self.tmp.name, f'{pid}.json'), 'w') as f:
+            json.dump(snapshot, f)
+
+    def test_workers_are_summed(self):
+        self.counter.inc(status=200)
+        self.histogram.observe(0.05)
+        self.other_worker(os.getpid() + 1, {
+            'test_requests_total': [[['200'], 2], [['500'], 1]],
+            'test_seconds': [[[], [[0, 1], 0.5, 1]]],
+        })
+
+        body = metrics.render()
+        self.assertIn('test_requests_total{status="200"} 3', body)
+        self.assertIn('test_requests_total{status="500"} 1', body)
+        self.assertIn('test_seconds_bucket{le="1.0"} 2', body)
+        self.assertIn('test_seconds_count 2', body)
+
+    def test_own_snapshot_is_not_counted_twice(self):
+        self.counter.inc(status=200)
+        metrics.flush()
+        self.assertIn('test_requests_total{status="200"} 1', metrics.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+DATARADAR - Search Cache Tests
+Values a worker takes from the shared cache come back in the packed form
+fetch() returns, whichever path they arrive by
+
+Run: python -m unittest test_search_cache
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from listings import ListingBatch
+from search_cache import SearchCache
+from shared_cache import SharedCache
+
+DEALS = [
+    {'id': 'v1|100000000001|0', 'title': 'Buzz Aldrin signed photo COA', 'price': 450.0,
+     'seller': 'spacecollector', 'condition': 'Used'},
+    {'id': 'v1|100000000002|0', 'title': 'Death NYC signed print', 'price': 95.0,
+     'seller': 'streetart', 'condition': 'New'},
+]
+
+KEY = ('signed', 0.0, 500.0, 20, 'price', 'EBAY_US')
+
+
+class SharedSearchCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'shared.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def worker_cache(self):
+        """One server worker's cache over the shared file"""
+        return SearchCache(shared=SharedCache(self.db_path), pack=ListingBatch.from_dicts)
+
+    def test_waiting_worker_gets_packed_value(self):
+        holder, waiter = self.worker_cache(), self.worker_cache()
+        fetching = threading.Event()
+
+        def slow_fetch():
+            fetching.set()
+            time.sleep(0.3)
+            return ListingBatch.from_dicts(DEALS)
+
+        thread = threading.Thread(target=holder.get_or_fetch, args=(KEY, slow_fetch))
+        thread.start()
+        fetching.wait(5)
+
+        # The holder has the fetch lease, so this waits for its result
+        value = waiter.get_or_fetch(KEY, lambda: self.fail('waiting worker fetched'))
+        thread.join()
+
+        self.assertIsInstance(value, ListingBatch)
+        self.assertEqual(value.to_dicts(), DEALS)
+        # And it stays packed in the waiter's own cache
+        self.assertIsInstance(waiter.get_or_fetch(KEY, lambda: None), ListingBatch)
+
+    def test_adopted_value_is_packed(self):
+        self.worker_cache().get_or_fetch(KEY, lambda: ListingBatch.from_dicts(DEALS))
+
+        value = self.worker_cache().get_or_fetch(KEY, lambda: self.fail('adopting worker fetched'))
+        self.assertIsInstance(value, ListingBatch)
+        self.assertEqual(value.to_dicts(), DEALS)
+
+
+if __name__ == '__main__':
+    unittest.main()
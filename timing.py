@@ -0,0 +1,111 @@
+"""
+DATARADAR - Request Timing
+Named spans per request for the Server-Timing header, plus sampled
+cProfile captures of slow requests
+"""
+
+import contextvars
+import cProfile
+import random
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Spans of the request running in the current context (None outside a request,
+# e.g. in background refresh threads, where span() is a no-op)
+_current = contextvars.ContextVar('request_timer', default=None)
+
+
+class RequestTimer:
+    """Accumulated time per span name for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}   # name -> [seconds, count]
+
+    def add(self, name, seconds):
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def header(self):
+        """Server-Timing header value, e.g. 'token;dur=0.4, browse;dur=212.9, total;dur=220.1'"""
+        parts = []
+        for name, (seconds, count) in self.spans.items():
+            part = f'{name};dur={seconds * 1000:.1f}'
+            if count > 1:
+                part += f';desc="{count} calls"'
+            parts.append(part)
+        parts.append(f'total;dur={self.elapsed_ms():.1f}')
+        return ', '.join(parts)
+
+
+def start_request():
+    """Begin collecting spans for the request in the current context"""
+    timer = RequestTimer()
+    _current.set(timer)
+    return timer
+
+
+def end_request():
+    """Stop collecting and return the request's timer (or None)"""
+    timer = _current.get()
+    _current.set(None)
+    return timer
+
+
+@contextmanager
+def span(name):
+    """Time a with-block under name, if a request is being timed"""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+# =============================================================================
+# Slow Request Profiling
+# =============================================================================
+
+
+def start_profile(sample_rate):
+    """Start a cProfile for this request with probability sample_rate, else None"""
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is already active in this process
+        return None
+    return profile
+
+
+def finish_profile(profile, elapsed_ms, slow_ms, out_dir, label):
+    """
+    Stop a profile and save it if the request was slow
+
+    Saved files load with `python -m pstats <file>` or snakeviz.
+
+    Returns:
+        Path of the saved .prof file, or None
+    """
+    profile.disable()
+    if elapsed_ms < slow_ms:
+        return None
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    safe_label = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_') or 'root'
+    path = out_dir / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{safe_label}-{int(elapsed_ms)}ms.prof"
+    profile.dump_stats(path)
+    return path
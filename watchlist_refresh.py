@@ -0,0 +1,178 @@
+"""
+DATARADAR - Watchlist Refresh
+Checks watchlist items that point at a specific eBay listing by item id,
+twenty per request, and marks them repriced, sold or ended in the
+watchlist store
+"""
+
+import re
+import time
+from datetime import datetime, timezone
+
+from ebay_api import BROWSE_ITEMS_BATCH, fetch_items
+from quota import PRIORITY_WATCHLIST, get_quota_budget
+from scan_engine import run_searches
+from watchlist_store import get_watchlist_store
+
+# An item checked this recently keeps its cached state (seconds)
+WATCHLIST_REFRESH_TTL = 15 * 60
+
+# Batches looked up at once
+REFRESH_CONCURRENCY = 8
+
+# Listings in these states are not looked up again
+FINAL_STATES = ('sold', 'ended')
+
+# Consecutive lookups a listing must be missing from before it counts as
+# ended (getItems can briefly drop a live listing)
+MISSES_BEFORE_ENDED = 2
+
+_RESTFUL_ID_RE = re.compile(r'v1\|\d+\|\d+')
+_LEGACY_ID_RE = re.compile(r'\d{9,15}')
+_ITEM_URL_RE = re.compile(r'/itm/(?:[^/?#]+/)?(\d{9,15})')
+
+
+def ebay_item_id(item):
+    """
+    RESTful eBay item id ('v1|123456789012|0') for a watchlist item, or
+    None if it isn't tied to a listing
+
+    Accepts an explicit ebay_item_id (Browse or legacy numeric), a Browse
+    item id as the item's id (items added from search results), or an
+    ebay.com/itm/ URL. A bare numeric id is not enough: manual entries
+    get a timestamp id that looks just like a legacy item id.
+    """
+    item_id = str(item.get('id') or '')
+    match = _ITEM_URL_RE.search(item.get('url') or '')
+    explicit = str(item.get('ebay_item_id') or '')
+
+    if _RESTFUL_ID_RE.fullmatch(explicit):
+        return explicit
+    if _LEGACY_ID_RE.fullmatch(explicit):
+        return f'v1|{explicit}|0'
+    if _RESTFUL_ID_RE.fullmatch(item_id):
+        return item_id
+    return f'v1|{match.group(1)}|0' if match else None
+
+
+def listing_state(ebay_item, now=None):
+    """
+    ('active' | 'sold' | 'ended', price) for a Browse item (None = not found)
+
+    eBay's lookup drops ended listings, so a missing item counts as ended
+    (refresh_watchlist waits for MISSES_BEFORE_ENDED misses in a row).
+    A listing with nothing left in stock counts as sold.
+    """
+    if ebay_item is None:
+        return 'ended', None
+
+    price = float(ebay_item.get('price', {}).get('value', 0)) or None
+    availability = (ebay_item.get('estimatedAvailabilities') or [{}])[0]
+    if availability.get('estimatedAvailabilityStatus') == 'OUT_OF_STOCK':
+        return 'sold', price
+
+    end_date = ebay_item.get('itemEndDate')
+    if end_date:
+        ended_at = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        if ended_at < (now or datetime.now(timezone.utc)):
+            return 'ended', price
+    return 'active', price
+
+
+def _checked_recently(item, now):
+    checked_at = item.get('checked_at')
+    if not checked_at:
+        return False
+    return now - datetime.fromisoformat(checked_at).timestamp() < WATCHLIST_REFRESH_TTL
+
+
+def refresh_watchlist(get_headers, force=False):
+    """
+    Refresh every watchlist item tied to an eBay listing
+
+    Items already sold or ended, or checked within WATCHLIST_REFRESH_TTL
+    (unless force), keep their cached state and cost nothing. The rest are
+    looked up BROWSE_ITEMS_BATCH at a time, and all changes are written to
+    the store in one transaction. Each item gains:
+        ebay_item_id: The listing it tracks
+        listing_state: 'active', 'repriced', 'sold' or 'ended'
+        current_price: Latest listing price
+        previous_price: Price before the last change (repriced only)
+        missed_checks: Lookups in a row the listing was missing from
+        checked_at: When it was last looked up
+
+    Args:
+        get_headers: Callable returning Browse API request headers
+        force: Look up items even if checked recently
+
+    Returns:
+        Summary dict with counts per outcome and the eBay calls made
+    """
+    store = get_watchlist_store()
+    budget = get_quota_budget()
+    now = time.time()
+
+    # Several entries may track the same listing
+    tracked = {}
+    skipped = 0
+    updates = {}
+    for item in store.all():
+        ebay_id = ebay_item_id(item)
+        if not ebay_id:
+            continue
+        if item.get('listing_state') in FINAL_STATES or (not force and _checked_recently(item, now)):
+            skipped += 1
+            continue
+        tracked.setdefault(ebay_id, []).append(item)
+
+    ids = list(tracked)
+    batches = []
+    deferred = 0
+    for i in range(0, len(ids), BROWSE_ITEMS_BATCH):
+        batch = ids[i:i + BROWSE_ITEMS_BATCH]
+        if budget.try_acquire(PRIORITY_WATCHLIST):
+            batches.append({'query': f'{len(batch)} watchlist items', 'ids': batch})
+        else:
+            deferred += len(batch)
+
+    results = run_searches(batches, lambda batch: fetch_items(batch['ids'], get_headers),
+                           concurrency=REFRESH_CONCURRENCY)
+
+    summary = {'checked': 0, 'active': 0, 'repriced': 0, 'sold': 0, 'ended': 0, 'missing': 0,
+               'cached': skipped, 'deferred': deferred, 'errors': 0, 'calls': len(batches)}
+    checked_at = datetime.fromtimestamp(now).isoformat()
+    for batch, found in zip(batches, results):
+        if found is None:
+            summary['errors'] += len(batch['ids'])
+            continue
+        for ebay_id in batch['ids']:
+            state, price = listing_state(found.get(ebay_id))
+            for item in tracked[ebay_id]:
+                fields = {'ebay_item_id': ebay_id, 'listing_state': state, 'checked_at': checked_at,
+                          'missed_checks': 0}
+                if ebay_id not in found:
+                    fields['missed_checks'] = item.get('missed_checks', 0) + 1
+                    if fields['missed_checks'] < MISSES_BEFORE_ENDED:
+                        # Keep the last known state until the next check confirms it
+                        fields['listing_state'] = item.get('listing_state') or 'active'
+                        updates[item['id']] = fields
+                        summary['checked'] += 1
+                        summary['missing'] += 1
+                        continue
+                last_price = item.get('current_price')
+                if price is not None:
+                    fields['current_price'] = price
+                    if state == 'active' and last_price is not None and price != last_price:
+                        fields['listing_state'] = 'repriced'
+                        fields['previous_price'] = last_price
+                updates[item['id']] = fields
+                summary['checked'] += 1
+                summary[fields['listing_state']] += 1
+
+    if updates:
+        store.update_many(updates)
+
+    print(f"Watchlist refresh: {summary['checked']} checked in {summary['calls']} calls - "
+          f"{summary['repriced']} repriced, {summary['sold']} sold, {summary['ended']} ended, "
+          f"{summary['missing']} missing, {summary['cached']} cached")
+    return summary
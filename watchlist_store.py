@@ -0,0 +1,146 @@
+"""
+DATARADAR - Watchlist Store
+SQLite-backed watchlist with O(1) lookup by item id and atomic updates,
+safe for concurrent writers across Flask workers and the daily scanner
+"""
+
+import json
+import threading
+from pathlib import Path
+
+from db import SQLiteDB
+from metrics import WATCHLIST_OPERATIONS
+
+BASE_DIR = Path(__file__).parent
+
+WATCHLIST_DB = BASE_DIR / 'watchlist.db'
+WATCHLIST_JSON = BASE_DIR / 'watchlist.json'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class WatchlistStore:
+    """
+    Watchlist items keyed by id, kept in insertion order
+
+    Each item is stored as its JSON dict, so the API shape is exactly what
+    watchlist.json held. On first use, an existing watchlist.json is imported.
+    """
+
+    def __init__(self, db_path=WATCHLIST_DB, json_path=WATCHLIST_JSON):
+        self.db = SQLiteDB(db_path, SCHEMA)
+        self.json_path = Path(json_path) if json_path else None
+        self._import_json()
+
+    def _import_json(self):
+        """One-time import of the legacy watchlist.json"""
+        if not self.json_path or not self.json_path.exists():
+            return
+
+        with self.db.transaction() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'json_imported'").fetchone()
+            if done:
+                return
+            try:
+                with open(self.json_path, 'r') as f:
+                    items = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Watchlist import error: {e}")
+                items = []
+
+            for item in items:
+                if item.get('id'):
+                    conn.execute('INSERT OR IGNORE INTO watchlist (id, data) VALUES (?, ?)',
+                                 (item['id'], json.dumps(item)))
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)",
+                         (str(len(items)),))
+
+    def all(self):
+        """All items in the order they were added"""
+        rows = self.db.conn().execute('SELECT data FROM watchlist ORDER BY seq').fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def get(self, item_id):
+        row = self.db.conn().execute('SELECT data FROM watchlist WHERE id = ?',
+                                      (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self):
+        return self.db.conn().execute('SELECT COUNT(*) FROM watchlist').fetchone()[0]
+
+    def add(self, item):
+        """Add item unless its id is already present. Returns True if added."""
+        with self.db.transaction() as conn:
+            cursor = conn.execute('INSERT OR IGNORE INTO watchlist (id, data) VALUES (?, ?)',
+                                  (item['id'], json.dumps(item)))
+            added = cursor.rowcount == 1
+        WATCHLIST_OPERATIONS.inc(operation='add', result='ok' if added else 'exists')
+        return added
+
+    def remove(self, item_id):
+        """Remove item by id. Returns True if it existed."""
+        with self.db.transaction() as conn:
+            cursor = conn.execute('DELETE FROM watchlist WHERE id = ?', (item_id,))
+            removed = cursor.rowcount == 1
+        WATCHLIST_OPERATIONS.inc(operation='remove', result='ok' if removed else 'missing')
+        return removed
+
+    def update(self, item_id, **fields):
+        """Merge fields into an item atomically. Returns the updated item, or None."""
+        item = None
+        with self.db.transaction() as conn:
+            row = conn.execute('SELECT data FROM watchlist WHERE id = ?', (item_id,)).fetchone()
+            if row:
+                item = json.loads(row[0])
+                item.update(fields)
+                item['id'] = item_id
+                conn.execute('UPDATE watchlist SET data = ? WHERE id = ?', (json.dumps(item), item_id))
+        WATCHLIST_OPERATIONS.inc(operation='update', result='ok' if item else 'missing')
+        return item
+
+    def update_many(self, updates):
+        """
+        Merge fields into several items in one transaction
+
+        Args:
+            updates: Dict of item id -> fields
+
+        Returns:
+            Number of items updated (missing ids are skipped)
+        """
+        updated = 0
+        with self.db.transaction() as conn:
+            for item_id, fields in updates.items():
+                row = conn.execute('SELECT data FROM watchlist WHERE id = ?', (item_id,)).fetchone()
+                if not row:
+                    continue
+                item = json.loads(row[0])
+                item.update(fields)
+                item['id'] = item_id
+                conn.execute('UPDATE watchlist SET data = ? WHERE id = ?', (json.dumps(item), item_id))
+                updated += 1
+        WATCHLIST_OPERATIONS.inc(updated, operation='update', result='ok')
+        return updated
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_watchlist_store():
+    """Return the process-wide watchlist store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WatchlistStore()
+        return _store